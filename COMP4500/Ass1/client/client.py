@@ -36,7 +36,7 @@ class Client:
 
             # Read response frame (length + rest)
             length_prefix = await asyncio.wait_for(reader.readexactly(4), timeout=self.timeout)
-            (frame_len,) = protocol.struct.unpack("!I", length_prefix)
+            (frame_len,) = protocol.unpack_len_from(length_prefix)
             frame_rest = await asyncio.wait_for(reader.readexactly(frame_len), timeout=self.timeout)
             rsp = length_prefix + frame_rest
 
@@ -1,4 +1,6 @@
 # common/protocol.py
+import ctypes
+import ctypes.util
 import struct
 import zlib
 from typing import Dict, Tuple
@@ -12,20 +14,70 @@ Header = ver(1), type(1), flags(1), fmt(1), req_id(2), reserved(2)
 """
 
 HEADER_STRUCT = struct.Struct("!BBBBHH")  # network byte order
+_LEN_STRUCT = struct.Struct("!I")  # length prefix and CRC trailer
+_HDR_SIZE = HEADER_STRUCT.size
+_REQ_ID_STRUCT = struct.Struct("!H")
+_REQ_ID_OFFSET = 4 + 4  # length prefix, then ver/type/flags/fmt
+
+# Bound unpackers: (frame_len,) = unpack_len_from(buf, offset=0)
+unpack_len_from = _LEN_STRUCT.unpack_from
+_unpack_hdr_from = HEADER_STRUCT.unpack_from
+
+# CRC32 backend. zlib.crc32 is the default; if zlib-ng is installed its
+# PCLMULQDQ/VPCLMULQDQ-folded crc32 is used for payloads big enough to
+# outweigh the ctypes call overhead. Both compute the same IEEE CRC32.
+_ACCEL_MIN_LEN = 256
+_zlib_crc32 = zlib.crc32
+
+
+def _load_zng_crc32():
+    path = ctypes.util.find_library("z-ng")
+    if not path:
+        return None
+    try:
+        lib = ctypes.CDLL(path)
+    except OSError:
+        return None
+    # zng_crc32_z takes a size_t length; zng_crc32 only a uint32_t one
+    for name, len_type in (("zng_crc32_z", ctypes.c_size_t), ("zng_crc32", ctypes.c_uint32)):
+        fn = getattr(lib, name, None)
+        if fn is not None:
+            break
+    else:
+        return None
+    fn.argtypes = (ctypes.c_uint32, ctypes.c_char_p, len_type)
+    fn.restype = ctypes.c_uint32
+    # Only trust the binding if it agrees with zlib (catches a mismatched ABI)
+    probe = bytes(range(256)) * 3
+    if fn(0, probe, len(probe)) != _zlib_crc32(probe) or fn(0x1234, probe, 17) != _zlib_crc32(probe[:17], 0x1234):
+        return None
+    return fn
+
+
+_zng_crc32 = _load_zng_crc32()
+
+
+def _crc32_accel(data, value: int = 0) -> int:
+    # c_char_p only takes bytes; anything else (memoryview etc.) stays on zlib
+    if len(data) < _ACCEL_MIN_LEN or type(data) is not bytes:
+        return _zlib_crc32(data, value)
+    return _zng_crc32(value, data, len(data))
+
+
+_crc32 = _crc32_accel if _zng_crc32 is not None else _zlib_crc32
 
 
 def kv_encode(data: Dict[str, str]) -> bytes:
     """Encode dict to key=value lines (UTF-8)."""
-    return "\n".join(f"{k}={v}" for k, v in data.items()).encode("utf-8")
+    return b"\n".join([k.encode("utf-8") + b"=" + v.encode("utf-8") for k, v in data.items()])
 
 
 def kv_decode(data: bytes) -> Dict[str, str]:
     """Decode key=value lines (UTF-8) to dict."""
-    lines = data.decode("utf-8").splitlines()
     result = {}
-    for line in lines:
-        if "=" in line:
-            k, v = line.split("=", 1)
+    for line in data.decode("utf-8").splitlines():
+        k, sep, v = line.partition("=")
+        if sep:
             result[k.strip()] = v.strip()
     return result
 
@@ -39,10 +91,15 @@ def encode_frame(
     version: int = codes.PROTOCOL_VERSION,
 ) -> bytes:
     """Build a complete frame with header, payload, and CRC."""
-    header = HEADER_STRUCT.pack(version, msg_type, flags, fmt, req_id, 0)
-    crc = zlib.crc32(header + payload) & 0xFFFFFFFF
-    frame_len = HEADER_STRUCT.size + len(payload) + 4  # header + payload + CRC
-    return struct.pack("!I", frame_len) + header + payload + struct.pack("!I", crc)
+    # One buffer for the whole frame; every field is packed into it in place
+    total = 4 + _HDR_SIZE + len(payload) + 4
+    buf = bytearray(total)
+    _LEN_STRUCT.pack_into(buf, 0, total - 4)  # header + payload + CRC
+    HEADER_STRUCT.pack_into(buf, 4, version, msg_type, flags, fmt, req_id, 0)
+    buf[4 + _HDR_SIZE : total - 4] = payload
+    crc = _crc32(payload, _crc32(memoryview(buf)[4 : 4 + _HDR_SIZE])) & 0xFFFFFFFF
+    _LEN_STRUCT.pack_into(buf, total - 4, crc)
+    return bytes(buf)
 
 
 def decode_frame(data: bytes) -> Tuple[dict, bytes]:
@@ -50,19 +107,20 @@ def decode_frame(data: bytes) -> Tuple[dict, bytes]:
     if len(data) < 4:
         raise ValueError("Incomplete frame length")
 
-    (frame_len,) = struct.unpack("!I", data[:4])
+    (frame_len,) = unpack_len_from(data, 0)
     if len(data) != frame_len + 4:
         raise ValueError("Frame length mismatch")
 
-    header_bytes = data[4 : 4 + HEADER_STRUCT.size]
-    payload_bytes = data[4 + HEADER_STRUCT.size : -4]
-    (crc_recv,) = struct.unpack("!I", data[-4:])
+    # Header and CRC are read straight out of data; only the payload is copied
+    mv = memoryview(data)
+    payload_bytes = bytes(mv[4 + _HDR_SIZE : -4])
+    (crc_recv,) = unpack_len_from(data, len(data) - 4)
 
-    crc_calc = zlib.crc32(header_bytes + payload_bytes) & 0xFFFFFFFF
+    crc_calc = _crc32(payload_bytes, _crc32(mv[4 : 4 + _HDR_SIZE])) & 0xFFFFFFFF
     if crc_calc != crc_recv:
         raise ValueError(f"CRC mismatch: got {crc_recv}, expected {crc_calc}")
 
-    ver, msg_type, flags, fmt, req_id, _ = HEADER_STRUCT.unpack(header_bytes)
+    ver, msg_type, flags, fmt, req_id, _ = _unpack_hdr_from(data, 4)
     header_dict = {
         "version": ver,
         "type": msg_type,
@@ -72,3 +130,23 @@ def decode_frame(data: bytes) -> Tuple[dict, bytes]:
     }
 
     return header_dict, payload_bytes
+
+
+def with_req_id(frame: bytes, req_id: int) -> bytes:
+    """Copy of a complete frame with req_id replaced and the CRC recomputed."""
+    buf = bytearray(frame)
+    _REQ_ID_STRUCT.pack_into(buf, _REQ_ID_OFFSET, req_id)
+    end = len(buf) - 4
+    _LEN_STRUCT.pack_into(buf, end, _crc32(memoryview(buf)[4:end]) & 0xFFFFFFFF)
+    return bytes(buf)
+
+
+# The functions above are the reference implementation. If the Cython
+# extension has been built (see protocol_fast.pyx), its encode_frame and
+# decode_frame take over.
+py_encode_frame = encode_frame
+py_decode_frame = decode_frame
+try:
+    from common.protocol_fast import decode_frame, encode_frame
+except ImportError:
+    pass
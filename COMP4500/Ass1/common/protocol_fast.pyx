@@ -0,0 +1,115 @@
+# common/protocol_fast.pyx
+# cython: language_level=3, boundscheck=False, wraparound=False
+# distutils: libraries = z
+"""
+C-compiled frame encoder/decoder (optional). Build in place from the project root with:
+
+    CFLAGS="-O3" cythonize -i common/protocol_fast.pyx
+
+Same signatures and results as protocol.encode_frame / protocol.decode_frame;
+protocol.py picks these up when the extension has been built. The whole frame
+is written into a single bytes object and the CRC runs over it with zlib's
+crc32 directly, without a Python call per field.
+"""
+import struct
+
+from cpython.bytes cimport PyBytes_AS_STRING, PyBytes_FromStringAndSize
+from libc.string cimport memcpy
+
+from common import codes
+
+cdef extern from "zlib.h":
+    unsigned long crc32(unsigned long crc, const unsigned char *buf, unsigned int len) nogil
+
+ctypedef unsigned int u32
+
+cdef Py_ssize_t HDR_SIZE = 8
+
+
+cdef inline void _put_u32(unsigned char *p, u32 v) noexcept nogil:
+    p[0] = (v >> 24) & 0xFF
+    p[1] = (v >> 16) & 0xFF
+    p[2] = (v >> 8) & 0xFF
+    p[3] = v & 0xFF
+
+
+cdef inline u32 _get_u32(const unsigned char *p) noexcept nogil:
+    return (<u32>p[0] << 24) | (<u32>p[1] << 16) | (<u32>p[2] << 8) | <u32>p[3]
+
+
+cdef inline u32 _get_u16(const unsigned char *p) noexcept nogil:
+    return (<u32>p[0] << 8) | <u32>p[1]
+
+
+def encode_frame(
+    int msg_type,
+    int req_id,
+    const unsigned char[::1] payload,
+    int flags=0,
+    int fmt=0,
+    int version=codes.PROTOCOL_VERSION,
+):
+    """Build a complete frame with header, payload, and CRC."""
+    if not (0 <= version <= 0xFF and 0 <= msg_type <= 0xFF and 0 <= flags <= 0xFF and 0 <= fmt <= 0xFF):
+        raise struct.error("ubyte format requires 0 <= number <= 255")
+    if not 0 <= req_id <= 0xFFFF:
+        raise struct.error("'H' format requires 0 <= number <= 65535")
+    cdef Py_ssize_t n = payload.shape[0]
+    cdef Py_ssize_t frame_len = HDR_SIZE + n + 4  # header + payload + CRC
+    if frame_len > 0xFFFFFFFF:
+        raise struct.error("'I' format requires 0 <= number <= 4294967295")
+
+    out = PyBytes_FromStringAndSize(NULL, 4 + frame_len)
+    cdef unsigned char *p = <unsigned char *>PyBytes_AS_STRING(out)
+    _put_u32(p, <u32>frame_len)
+    p[4] = version
+    p[5] = msg_type
+    p[6] = flags
+    p[7] = fmt
+    p[8] = (req_id >> 8) & 0xFF
+    p[9] = req_id & 0xFF
+    p[10] = 0
+    p[11] = 0
+    if n:
+        memcpy(p + 4 + HDR_SIZE, &payload[0], n)
+    _put_u32(p + 4 + HDR_SIZE + n, <u32>crc32(0, p + 4, <unsigned int>(HDR_SIZE + n)))
+    return out
+
+
+def decode_frame(data):
+    """Decode a complete frame into header dict and payload."""
+    cdef const unsigned char[::1] view = data
+    cdef Py_ssize_t n = view.shape[0]
+    if n < 4:
+        raise ValueError("Incomplete frame length")
+    cdef const unsigned char *p = &view[0]
+    if n != <Py_ssize_t>_get_u32(p) + 4:
+        raise ValueError("Frame length mismatch")
+
+    # Mirror the slice semantics of the Python version for runt frames
+    cdef Py_ssize_t hdr_end = 4 + HDR_SIZE if n >= 4 + HDR_SIZE else n
+    cdef Py_ssize_t pay_len = n - 4 - (4 + HDR_SIZE)
+    if pay_len < 0:
+        pay_len = 0
+    payload = PyBytes_FromStringAndSize(<const char *>p + 4 + HDR_SIZE, pay_len) if pay_len else b""
+
+    cdef u32 crc_recv = _get_u32(p + n - 4)
+    cdef u32 crc_calc = <u32>crc32(0, p + 4, <unsigned int>(hdr_end - 4))
+    if pay_len:
+        crc_calc = <u32>crc32(crc_calc, p + 4 + HDR_SIZE, <unsigned int>pay_len)
+    if crc_calc != crc_recv:
+        raise ValueError(f"CRC mismatch: got {crc_recv}, expected {crc_calc}")
+    if n < 4 + HDR_SIZE:
+        raise struct.error(
+            f"unpack_from requires a buffer of at least {4 + HDR_SIZE} bytes for unpacking "
+            f"{HDR_SIZE} bytes at offset 4 (actual buffer size is {n})"
+        )
+
+    header_dict = {
+        "version": p[4],
+        "type": p[5],
+        "flags": p[6],
+        "fmt": p[7],
+        "req_id": _get_u16(p + 8),
+    }
+    return header_dict, payload
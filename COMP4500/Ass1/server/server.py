@@ -1,12 +1,13 @@
 # server/server.py
 import argparse
 import asyncio
-from decimal import Decimal
-from typing import Dict
+from typing import Dict, Tuple
 
 from common import protocol, codes
 from server.storage import ElementStore
 
+_unpack_len_from = protocol.unpack_len_from
+
 
 def kv_ok(data: Dict[str, str], req_id: int) -> bytes:
     payload = protocol.kv_encode(data)
@@ -22,120 +23,146 @@ def kv_err(code: int, msg: str, req_id: int) -> bytes:
     )
 
 
+# (code, msg) -> error frame encoded with req_id 0, built on first use
+_ERR_FRAMES: Dict[Tuple[int, str], bytes] = {}
+
+
+def kv_err_fixed(code: int, msg: str, req_id: int) -> bytes:
+    """kv_err for a constant message: the frame is encoded once, then only req_id and CRC change."""
+    frame = _ERR_FRAMES.get((code, msg))
+    if frame is None:
+        frame = _ERR_FRAMES[(code, msg)] = kv_err(code, msg, 0)
+    return protocol.with_req_id(frame, req_id)
+
+
 class ElementServer:
     def __init__(self, store: ElementStore):
         self.store = store
 
-    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
-        addr = writer.get_extra_info("peername")
+    def handle_frame(self, frame: bytes) -> bytes:
+        """Decode one complete request frame and return the response frame."""
         try:
-            while True:
-                # Read 4-byte length prefix
-                length_prefix = await reader.readexactly(4)
-                # Now read the rest of the frame
-                (frame_len,) = protocol.struct.unpack("!I", length_prefix)
-                frame_rest = await reader.readexactly(frame_len)
-                frame = length_prefix + frame_rest
-
-                try:
-                    header, payload = protocol.decode_frame(frame)
-                except ValueError as e:
-                    # Bad CRC or malformed frame
-                    # We don’t know req_id safely here; echo 0
-                    writer.write(kv_err(codes.ERR_BAD_CRC, str(e), req_id=0))
-                    await writer.drain()
-                    continue
-
-                # Version check
-                if header["version"] != codes.PROTOCOL_VERSION:
-                    writer.write(kv_err(codes.ERR_BAD_VERSION, "Unsupported protocol version", header["req_id"]))
-                    await writer.drain()
-                    continue
-
-                # Decode payload KV
-                try:
-                    kv = protocol.kv_decode(payload)
-                except Exception:
-                    writer.write(kv_err(codes.ERR_MALFORMED_PAYLOAD, "Malformed payload", header["req_id"]))
-                    await writer.drain()
-                    continue
-
-                msg_type = header["type"]
-
-                if msg_type == codes.TYPE_GET_WEIGHT:
-                    await self._handle_get_weight(kv, header["req_id"], writer)
-                elif msg_type == codes.TYPE_GET_QUANTITY:
-                    await self._handle_get_quantity(kv, header["req_id"], writer)
-                elif msg_type == codes.TYPE_ADD_ELEMENT:
-                    await self._handle_add(kv, header["req_id"], writer)
-                else:
-                    writer.write(kv_err(codes.ERR_BAD_TYPE, f"Unknown type {msg_type}", header["req_id"]))
-                    await writer.drain()
-        except asyncio.IncompleteReadError:
-            # client closed connection
-            pass
-        finally:
-            writer.close()
-            try:
-                await writer.wait_closed()
-            except Exception:
-                pass
-
-    async def _handle_get_weight(self, kv: Dict[str, str], req_id: int, writer):
+            header, payload = protocol.decode_frame(frame)
+        except ValueError as e:
+            # Bad CRC or malformed frame
+            # We don’t know req_id safely here; echo 0
+            return kv_err(codes.ERR_BAD_CRC, str(e), req_id=0)
+
+        # Version check
+        if header["version"] != codes.PROTOCOL_VERSION:
+            return kv_err_fixed(codes.ERR_BAD_VERSION, "Unsupported protocol version", header["req_id"])
+
+        # Decode payload KV
+        try:
+            kv = protocol.kv_decode(payload)
+        except Exception:
+            return kv_err_fixed(codes.ERR_MALFORMED_PAYLOAD, "Malformed payload", header["req_id"])
+
+        msg_type = header["type"]
+
+        if msg_type == codes.TYPE_GET_WEIGHT:
+            return self._handle_get_weight(kv, header["req_id"])
+        elif msg_type == codes.TYPE_GET_QUANTITY:
+            return self._handle_get_quantity(kv, header["req_id"])
+        elif msg_type == codes.TYPE_ADD_ELEMENT:
+            return self._handle_add(kv, header["req_id"])
+        else:
+            return kv_err(codes.ERR_BAD_TYPE, f"Unknown type {msg_type}", header["req_id"])
+
+    def _handle_get_weight(self, kv: Dict[str, str], req_id: int) -> bytes:
         name = kv.get("name", "").strip()
         if not name:
-            writer.write(kv_err(codes.ERR_MISSING_FIELD, "name required", req_id))
-            await writer.drain()
-            return
+            return kv_err_fixed(codes.ERR_MISSING_FIELD, "name required", req_id)
         try:
-            weight: Decimal = self.store.get_weight(name)
+            weight = self.store.get_weight_str(name)
         except KeyError:
-            writer.write(kv_err(codes.ERR_NOT_FOUND, f"{name} not found", req_id))
-            await writer.drain()
-            return
-        writer.write(kv_ok({"weight": str(weight.normalize())}, req_id))
-        await writer.drain()
+            return kv_err(codes.ERR_NOT_FOUND, f"{name} not found", req_id)
+        return kv_ok({"weight": weight}, req_id)
 
-    async def _handle_get_quantity(self, kv: Dict[str, str], req_id: int, writer):
+    def _handle_get_quantity(self, kv: Dict[str, str], req_id: int) -> bytes:
         name = kv.get("name", "").strip()
         student = kv.get("student", "").strip()
         if not name or not student.isdigit():
-            writer.write(kv_err(codes.ERR_MISSING_FIELD, "name and numeric student required", req_id))
-            await writer.drain()
-            return
+            return kv_err_fixed(codes.ERR_MISSING_FIELD, "name and numeric student required", req_id)
         try:
             qty = self.store.get_quantity(name, int(student))
         except KeyError:
-            writer.write(kv_err(codes.ERR_NOT_FOUND, f"{name} not found", req_id))
-            await writer.drain()
-            return
-        writer.write(kv_ok({"quantity": str(qty)}, req_id))
-        await writer.drain()
+            return kv_err(codes.ERR_NOT_FOUND, f"{name} not found", req_id)
+        return kv_ok({"quantity": str(qty)}, req_id)
 
-    async def _handle_add(self, kv: Dict[str, str], req_id: int, writer):
+    def _handle_add(self, kv: Dict[str, str], req_id: int) -> bytes:
         name = kv.get("name", "").strip()
         weight = kv.get("weight", "").strip()
         if not name or not weight:
-            writer.write(kv_err(codes.ERR_MISSING_FIELD, "name and weight required", req_id))
-            await writer.drain()
-            return
+            return kv_err_fixed(codes.ERR_MISSING_FIELD, "name and weight required", req_id)
         # Very light name validation
         if len(name) > 60:
-            writer.write(kv_err(codes.ERR_INVALID_NAME, "name too long", req_id))
-            await writer.drain()
-            return
+            return kv_err_fixed(codes.ERR_INVALID_NAME, "name too long", req_id)
         try:
             self.store.add_element(name, weight)  # weight stays string → Decimal inside
         except ValueError as e:
             msg = str(e)
             if "Duplicate" in msg:
-                writer.write(kv_err(codes.ERR_DUPLICATE, msg, req_id))
-            else:
-                writer.write(kv_err(codes.ERR_INVALID_WEIGHT, "invalid weight", req_id))
-            await writer.drain()
-            return
-        writer.write(kv_ok({"status": "ok"}, req_id))
-        await writer.drain()
+                return kv_err(codes.ERR_DUPLICATE, msg, req_id)
+            return kv_err_fixed(codes.ERR_INVALID_WEIGHT, "invalid weight", req_id)
+        return kv_ok({"status": "ok"}, req_id)
+
+
+class ElementServerProtocol(asyncio.BufferedProtocol):
+    """
+    One client connection. The transport receives straight into a reusable
+    buffer; every complete frame in it is answered before reading again.
+
+    Replies to one read go out in a single writelines call. There is no
+    per-reply drain: if the client stops reading and the transport's write
+    buffer passes its high-water mark, reading is paused until it empties.
+    """
+
+    INITIAL_BUFFER = 64 * 1024
+
+    def __init__(self, server: ElementServer):
+        self.server = server
+        self.transport = None
+        self._rbuf = bytearray(self.INITIAL_BUFFER)
+        self._pos = 0  # bytes of _rbuf currently filled
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def get_buffer(self, sizehint: int):
+        if self._pos == len(self._rbuf):
+            # Full with a partial frame larger than the buffer; grow it
+            self._rbuf += bytes(len(self._rbuf))
+        return memoryview(self._rbuf)[self._pos :]
+
+    def buffer_updated(self, nbytes: int):
+        self._pos += nbytes
+        buf = self._rbuf
+        start = 0
+        replies = []
+        while self._pos - start >= 4:
+            (frame_len,) = _unpack_len_from(buf, start)
+            end = start + 4 + frame_len
+            if end > self._pos:
+                break
+            replies.append(self.server.handle_frame(buf[start:end]))
+            start = end
+        if replies:
+            self.transport.writelines(replies)
+        if start:
+            # Move the unfinished tail to the front (same size, so no resize)
+            rest = self._pos - start
+            buf[:rest] = buf[start : self._pos]
+            self._pos = rest
+
+    def pause_writing(self):
+        self.transport.pause_reading()
+
+    def resume_writing(self):
+        self.transport.resume_reading()
+
+    def connection_lost(self, exc):
+        self.transport = None
 
 
 async def main():
@@ -149,7 +176,10 @@ async def main():
     store.load_from_csv(args.elements)
 
     server = ElementServer(store)
-    srv = await asyncio.start_server(server.handle_client, host=args.host, port=args.port)
+    loop = asyncio.get_running_loop()
+    srv = await loop.create_server(
+        lambda: ElementServerProtocol(server), host=args.host, port=args.port
+    )
     sockets = ", ".join(str(sock.getsockname()) for sock in srv.sockets or [])
     print(f"Server listening on {sockets}")
 
@@ -159,6 +189,13 @@ async def main():
 
 if __name__ == "__main__":
     try:
-        asyncio.run(main())
+        import uvloop  # optional: faster event loop for small request/reply frames
+    except ImportError:
+        uvloop = None
+    try:
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\nServer stopped.")
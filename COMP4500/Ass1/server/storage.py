@@ -1,54 +1,120 @@
 # server/storage.py
 import csv
 import random
-from decimal import Decimal, InvalidOperation
-from typing import Dict, Tuple
+from decimal import Decimal, DecimalException, InvalidOperation
+from typing import Dict, List, Optional, Tuple
+
+
+# Weights with at most this many decimal places also get an exact scaled-int copy
+MICRO_DIGITS = 6
+MICRO = 10**MICRO_DIGITS
+
+
+def _to_micro(weight: Decimal) -> Optional[int]:
+    """weight * MICRO as an exact int, or None if that would lose digits."""
+    if weight.is_finite() and weight.as_tuple().exponent >= -MICRO_DIGITS:
+        try:
+            return int(weight.scaleb(MICRO_DIGITS))
+        except DecimalException:
+            pass  # exponent too large to scale; the Decimal path handles it
+    return None
 
 
 class ElementStore:
     def __init__(self):
-        # Store as: lower_name -> (CanonicalName, Decimal weight)
-        self.elements: Dict[str, Tuple[str, Decimal]] = {}
+        # Parallel columns indexed by slot; lower_name -> slot
+        self._idx: Dict[str, int] = {}
+        self._names: List[str] = []  # canonical names
+        self._weights: List[Decimal] = []
+        self._weight_strs: List[str] = []  # normalized weight strings
+        self._weights_micro: List[Optional[int]] = []  # weight * MICRO, None if inexact
+        self._getrandbits = random.Random().getrandbits
+
+    @property
+    def elements(self) -> Dict[str, Tuple[str, Decimal]]:
+        """lower_name -> (CanonicalName, Decimal weight), as before the column split; a snapshot."""
+        return {key: (self._names[i], self._weights[i]) for key, i in self._idx.items()}
+
+    def _put(self, key: str, name: str, weight: Decimal):
+        # Convert first, so a weight that fails here leaves the columns untouched
+        if not weight.is_finite():
+            raise InvalidOperation(f"non-finite weight {weight}")
+        weight_str = str(weight.normalize())
+        micro = _to_micro(weight)
+        i = self._idx.get(key)
+        if i is None:
+            self._idx[key] = len(self._names)
+            self._names.append(name)
+            self._weights.append(weight)
+            self._weight_strs.append(weight_str)
+            self._weights_micro.append(micro)
+        else:
+            self._names[i] = name
+            self._weights[i] = weight
+            self._weight_strs[i] = weight_str
+            self._weights_micro[i] = micro
+
+    def _slot(self, name: str) -> int:
+        try:
+            return self._idx[name.lower()]
+        except KeyError:
+            raise KeyError(f"Element '{name}' not found") from None
 
     def load_from_csv(self, csv_path: str):
         """Load elements from CSV file into memory."""
-        self.elements.clear()
+        # Split the whole file in one C-level pass, then convert the weights
         with open(csv_path, newline="", encoding="utf-8") as f:
-            reader = csv.reader(f)
-            for row in reader:
-                if len(row) < 2:
-                    continue
-                name = row[0].strip()
-                weight_str = row[1].strip()
-                try:
-                    weight = Decimal(weight_str)
-                    self.elements[name.lower()] = (name, weight)
-                except Exception:
-                    continue  # skip bad lines
+            rows = [(row[0].strip(), row[1].strip()) for row in csv.reader(f) if len(row) >= 2]
+        self._idx.clear()
+        self._names.clear()
+        self._weights.clear()
+        self._weight_strs.clear()
+        self._weights_micro.clear()
+        for name, weight_str in rows:
+            try:
+                self._put(name.lower(), name, Decimal(weight_str))
+            except DecimalException:
+                continue  # skip bad lines (unparsable, NaN/Infinity, out of range)
 
     def get_weight(self, name: str) -> Decimal:
         """Return weight for element name or raise KeyError."""
-        key = name.lower()
-        if key not in self.elements:
-            raise KeyError(f"Element '{name}' not found")
-        return self.elements[key][1]
+        return self._weights[self._slot(name)]
+
+    def get_weight_str(self, name: str) -> str:
+        """Return the normalized weight string for element name or raise KeyError."""
+        return self._weight_strs[self._slot(name)]
+
+    def _next_multiplier(self) -> int:
+        """Uniform random int in 1..10 (4 random bits, rejecting 10..15)."""
+        while True:
+            x = self._getrandbits(4)
+            if x < 10:
+                return x + 1
 
     def get_quantity(self, name: str, student_id: int) -> int:
         """Simulate quantity using formula."""
-        weight = self.get_weight(name)
-        multiplier = random.randint(1, 10)
-        quantity = multiplier * student_id * weight
-        return int(round(quantity, 0))
+        i = self._slot(name)
+        multiplier = self._next_multiplier()
+        micro = self._weights_micro[i]
+        if micro is None:
+            quantity = multiplier * student_id * self._weights[i]
+            return int(round(quantity, 0))
+        # Same result as the Decimal path (round half to even) in pure int math
+        q, r = divmod(multiplier * student_id * micro, MICRO)
+        r2 = 2 * r
+        if r2 > MICRO or (r2 == MICRO and q & 1):
+            q += 1
+        return q
 
     def add_element(self, name: str, weight: str):
         """Add new element if not duplicate. Weight is a string to avoid float rounding."""
         key = name.lower()
-        if key in self.elements:
+        if key in self._idx:
             raise ValueError(f"Duplicate element '{name}'")
         try:
             w = Decimal(weight)
-        except (InvalidOperation, TypeError):
-            raise ValueError("Invalid weight")
-        if w <= 0:
+            if not w.is_finite() or w <= 0:
+                raise ValueError("Invalid weight")
+            self._put(key, name, w)
+        except (DecimalException, TypeError):
             raise ValueError("Invalid weight")
-        self.elements[key] = (name, w)
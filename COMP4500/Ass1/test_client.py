@@ -7,54 +7,42 @@ DEFAULT_PORT = 5000
 DEFAULT_STUDENT_ID = 1234567  # change to yours
 
 
-def maybe_corrupt(frame: bytes, mode: str | None) -> bytes:
+def maybe_corrupt(frame: bytearray, mode: str | None) -> bytearray:
     """
-    Corrupt the encoded frame in one of two ways:
+    Corrupt the encoded frame in place in one of two ways:
       - 'payload': flip 1 bit in the first payload byte
       - 'crc': flip 1 bit in the last CRC byte
+    Returns the same bytearray.
     """
-    if not mode:
-        return frame
-
-    b = bytearray(frame)
-    length = len(b)
-
     if mode == "payload":
         # 4 bytes length + header size
         payload_start = 4 + protocol.HEADER_STRUCT.size
-        if payload_start < length - 4:
-            b[payload_start] ^= 0x01  # flip one bit
-        return bytes(b)
-
-    if mode == "crc":
+        if payload_start < len(frame) - 4:
+            frame[payload_start] ^= 0x01  # flip one bit
+    elif mode == "crc":
         # last byte of CRC
-        b[-1] ^= 0x01
-        return bytes(b)
-
+        frame[-1] ^= 0x01
     return frame
 
 
-async def send_request(host, port, msg_type, payload_dict, corrupt: str | None):
-    reader, writer = await asyncio.open_connection(host, port)
-
+async def rpc(reader, writer, msg_type, payload_dict, corrupt: str | None):
+    """Send one request on an open connection and return (header, kv_data)."""
     payload = protocol.kv_encode(payload_dict)
     frame = protocol.encode_frame(msg_type=msg_type, req_id=1, payload=payload)
-    frame = maybe_corrupt(frame, corrupt)
+    if corrupt:
+        frame = maybe_corrupt(bytearray(frame), corrupt)
 
     writer.write(frame)
     await writer.drain()
 
     # Read response
     length_prefix = await reader.readexactly(4)
-    (frame_len,) = protocol.struct.unpack("!I", length_prefix)
+    (frame_len,) = protocol.unpack_len_from(length_prefix)
     frame_rest = await reader.readexactly(frame_len)
     rsp_frame = length_prefix + frame_rest
 
     header, payload_bytes = protocol.decode_frame(rsp_frame)
     data = protocol.kv_decode(payload_bytes)
-
-    writer.close()
-    await writer.wait_closed()
     return header, data
 
 
@@ -70,26 +58,39 @@ async def main():
     )
     args = ap.parse_args()
 
-    print("=== Function 1: GET_WEIGHT (Dreamium) ===")
-    h, d = await send_request(args.host, args.port, codes.TYPE_GET_WEIGHT, {"name": "Dreamium"}, args.corrupt)
-    print("header:", h, "data:", d)
-
-    print("\n=== Function 2: GET_QUANTITY (Dreamium) ===")
-    h, d = await send_request(
-        args.host, args.port, codes.TYPE_GET_QUANTITY, {"name": "Dreamium", "student": str(args.student)}, args.corrupt
-    )
-    print("header:", h, "data:", d)
-
-    print("\n=== Function 3: ADD_ELEMENT (Testium, 999.99) ===")
-    h, d = await send_request(
-        args.host, args.port, codes.TYPE_ADD_ELEMENT, {"name": "Testium", "weight": "999.99"}, args.corrupt
-    )
-    print("header:", h, "data:", d)
-
-    print("\n=== Re-check GET_WEIGHT (Testium) ===")
-    h, d = await send_request(args.host, args.port, codes.TYPE_GET_WEIGHT, {"name": "Testium"}, args.corrupt)
-    print("header:", h, "data:", d)
+    demos = [
+        ("=== Function 1: GET_WEIGHT (Dreamium) ===", codes.TYPE_GET_WEIGHT, {"name": "Dreamium"}),
+        (
+            "\n=== Function 2: GET_QUANTITY (Dreamium) ===",
+            codes.TYPE_GET_QUANTITY,
+            {"name": "Dreamium", "student": str(args.student)},
+        ),
+        (
+            "\n=== Function 3: ADD_ELEMENT (Testium, 999.99) ===",
+            codes.TYPE_ADD_ELEMENT,
+            {"name": "Testium", "weight": "999.99"},
+        ),
+        ("\n=== Re-check GET_WEIGHT (Testium) ===", codes.TYPE_GET_WEIGHT, {"name": "Testium"}),
+    ]
+
+    # One connection for every demo request
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        for title, msg_type, payload in demos:
+            print(title)
+            h, d = await rpc(reader, writer, msg_type, payload, args.corrupt)
+            print("header:", h, "data:", d)
+    finally:
+        writer.close()
+        await writer.wait_closed()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop  # optional, as in server.server
+    except ImportError:
+        uvloop = None
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -9,8 +9,9 @@ from ..game.board import Board, BLACK, WHITE, SIZE
 
 # Algebraic helpers (A–H, 1–8)
 COL_TO_LET = "ABCDEFGH"
-LET_TO_COL = {c: i for i, c in enumerate(COL_TO_LET)}
-ROW_TO_NUM = [str(i + 1) for i in range(SIZE)]  # "1".."8"
+COL_HEADER = "    " + "".join(COL_TO_LET)
+SQUARE_NAMES = tuple(tuple(f"{COL_TO_LET[c]}{r+1}" for c in range(SIZE)) for r in range(SIZE))
+RULE = "=" * 40
 
 
 def color_name(player: str) -> str:
@@ -21,25 +22,23 @@ def render_board(board: Board, player_to_move: str, move_number: int) -> None:
     rows = board.to_rows()
     b, w, e = board.counts()
 
-    # Header
-    print()
-    print("=" * 40)
-    print(f" Move #{move_number} — {color_name(player_to_move)} to move")
-    print(f" Score: BLACK={b}  WHITE={w}  Empty={e}")
-    print("    " + "".join(COL_TO_LET))
-
+    # Build the whole block, then write it once
+    out = [
+        "",
+        RULE,
+        f" Move #{move_number} — {color_name(player_to_move)} to move",
+        f" Score: BLACK={b}  WHITE={w}  Empty={e}",
+        COL_HEADER,
+    ]
     for r in range(SIZE):
-        line = " ".join(rows[r])
-        print(f" {r+1:>2}  {line}")
-    print("=" * 40)
+        out.append(f" {r+1:>2}  {' '.join(rows[r])}")
+    out.append(RULE)
+    sys.stdout.write("\n".join(out) + "\n")
 
 
 def format_moves(moves: Sequence[Tuple[int, int]]) -> str:
     """Human-friendly listing with algebraic notation."""
-    parts = []
-    for i, (r, c) in enumerate(moves):
-        parts.append(f"[{i}] {COL_TO_LET[c]}{r+1}")
-    return ", ".join(parts)
+    return ", ".join([f"[{i}] {SQUARE_NAMES[r][c]}" for i, (r, c) in enumerate(moves)])
 
 
 def try_parse_algebraic(s: str) -> Optional[Tuple[int, int]]:
@@ -47,17 +46,22 @@ def try_parse_algebraic(s: str) -> Optional[Tuple[int, int]]:
     Accepts strings like 'd3', 'D3', 'a8'. Returns (row, col) 0-based or None if invalid.
     """
     s = s.strip()
-    if len(s) < 2 or len(s) > 3:
-        return None
-    col_ch = s[0].upper()
-    row_str = s[1:]
-    if col_ch not in LET_TO_COL:
+    n = len(s)
+    if n < 2 or n > 3:
         return None
-    if not row_str.isdigit():
+    # ASCII arithmetic: |0x20 folds 'A'..'H' onto 'a'..'h'; anything else lands out of range
+    col = (ord(s[0]) | 0x20) - 0x61
+    if col < 0 or col >= SIZE:
         return None
-    row = int(row_str) - 1
-    col = LET_TO_COL[col_ch]
-    if 0 <= row < SIZE and 0 <= col < SIZE:
+    if n == 2:
+        row = ord(s[1]) - 0x31
+    else:
+        d0 = ord(s[1]) - 0x30
+        d1 = ord(s[2]) - 0x30
+        if not (0 <= d0 <= 9 and 0 <= d1 <= 9):
+            return None
+        row = d0 * 10 + d1 - 1
+    if 0 <= row < SIZE:
         return (row, col)
     return None
 
@@ -3,8 +3,9 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable, List, Sequence, Tuple
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 # Cell values
 EMPTY = "."
@@ -18,73 +19,152 @@ Player = str  # "B" or "W"
 Grid = Tuple[Tuple[str, ...], ...]  # immutable (tuple-of-tuples)
 
 
+_OPPONENT = {BLACK: WHITE, WHITE: BLACK}
+
+
 def opponent(player: Player) -> Player:
-    if player == BLACK:
-        return WHITE
-    if player == WHITE:
-        return BLACK
-    raise ValueError(f"Invalid player: {player!r}")
+    try:
+        return _OPPONENT[player]
+    except KeyError:
+        raise ValueError(f"Invalid player: {player!r}") from None
+
+
+# Zobrist keys: ZOBRIST[sq] = (key if BLACK on sq, key if WHITE on sq).
+# Fixed seed so hashes are stable across runs.
+_zrng = random.Random(0x5EED_0E110)
+ZOBRIST: Tuple[Tuple[int, int], ...] = tuple(
+    (_zrng.getrandbits(64), _zrng.getrandbits(64)) for _ in range(SIZE * SIZE)
+)
+del _zrng
+# XOR into a hash to change the stone on sq from one colour to the other
+ZOBRIST_SWAP: Tuple[int, ...] = tuple(kb ^ kw for kb, kw in ZOBRIST)
+
+
+def iter_bits(bb: int) -> Iterator[int]:
+    """Yield the square index of each set bit, lowest first (row-major)."""
+    while bb:
+        b = bb & -bb
+        yield b.bit_length() - 1
+        bb ^= b
+
 
+def zobrist_hash(black: int, white: int) -> int:
+    """Full Zobrist hash of a position (XOR of the key of every stone)."""
+    h = 0
+    for sq in iter_bits(black):
+        h ^= ZOBRIST[sq][0]
+    for sq in iter_bits(white):
+        h ^= ZOBRIST[sq][1]
+    return h
 
-def in_bounds(r: int, c: int) -> bool:
-    return 0 <= r < SIZE and 0 <= c < SIZE
 
+_STR_HEADER = "   " + " ".join(str(c) for c in range(SIZE))
 
-@dataclass(frozen=True)
+
+def bit(r: int, c: int) -> int:
+    """Bitboard mask for square (r,c); bit index is r*8 + c (A1 = bit 0, H8 = bit 63)."""
+    return 1 << (r * SIZE + c)
+
+
+@dataclass(frozen=True, slots=True)
 class Board:
     """
-    Immutable board wrapper around a tuple-of-tuples grid.
+    Immutable board stored as two 64-bit bitboards, one per colour.
+    Bit index r*8 + c is set in `black`/`white` when that colour occupies (r,c).
+    `zobrist` is the position hash; it is computed if not supplied, so callers
+    that know it (e.g. an incremental move update) can pass it in.
 
     Use Board.initial() to create a fresh starting position.
     Use Board.from_rows for tests, and Board.to_rows() for debugging.
     """
 
-    grid: Grid
+    black: int
+    white: int
+    zobrist: Optional[int] = field(default=None, compare=False, repr=False)
+    # Legal-move bitboards per player, filled in lazily by rules.valid_moves_bb
+    _legal: Dict[str, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.zobrist is None:
+            object.__setattr__(self, "zobrist", zobrist_hash(self.black, self.white))
+
+    def __hash__(self) -> int:
+        return self.zobrist
 
     @staticmethod
     def initial() -> "Board":
-        rows: List[List[str]] = [[EMPTY] * SIZE for _ in range(SIZE)]
         mid = SIZE // 2
         # Standard Othello start
-        rows[mid - 1][mid - 1] = WHITE  # D4
-        rows[mid][mid] = WHITE          # E5
-        rows[mid - 1][mid] = BLACK      # E4
-        rows[mid][mid - 1] = BLACK      # D5
-        return Board(tuple(tuple(r) for r in rows))
+        return Board(
+            black=bit(mid - 1, mid) | bit(mid, mid - 1),  # E4, D5
+            white=bit(mid - 1, mid - 1) | bit(mid, mid),  # D4, E5
+        )
 
     @staticmethod
     def from_rows(rows: Sequence[Sequence[str]]) -> "Board":
         if len(rows) != SIZE or any(len(r) != SIZE for r in rows):
             raise ValueError("Board must be 8x8")
-        for rr in rows:
-            for cell in rr:
-                if cell not in (EMPTY, BLACK, WHITE):
+        black = white = 0
+        for r, rr in enumerate(rows):
+            for c, cell in enumerate(rr):
+                if cell == BLACK:
+                    black |= bit(r, c)
+                elif cell == WHITE:
+                    white |= bit(r, c)
+                elif cell != EMPTY:
                     raise ValueError(f"Invalid cell: {cell!r}")
-        return Board(tuple(tuple(r) for r in rows))
+        return Board(black, white)
+
+    # Tuple-of-tuples view, built on each access (debugging / tests only)
+    @property
+    def grid(self) -> Grid:
+        cells = self._cells()
+        return tuple(tuple(cells[i:i + SIZE]) for i in range(0, SIZE * SIZE, SIZE))
 
     def to_rows(self) -> List[List[str]]:
-        return [list(r) for r in self.grid]
+        cells = self._cells()
+        return [list(cells[i:i + SIZE]) for i in range(0, SIZE * SIZE, SIZE)]
 
     def cell(self, r: int, c: int) -> str:
-        if not in_bounds(r, c):
+        if (r | c) & ~7:  # 0x88-style: any bit above 0..7 (or a sign bit) is off-board
             raise IndexError("Out of bounds")
-        return self.grid[r][c]
+        i = r * SIZE + c
+        if self.black >> i & 1:
+            return BLACK
+        if self.white >> i & 1:
+            return WHITE
+        return EMPTY
 
     def count(self, player: Player) -> int:
-        return sum(cell == player for row in self.grid for cell in row)
+        if player == BLACK:
+            return self.black.bit_count()
+        if player == WHITE:
+            return self.white.bit_count()
+        if player == EMPTY:
+            return SIZE * SIZE - (self.black | self.white).bit_count()
+        return 0
 
     def counts(self) -> Tuple[int, int, int]:
-        b = self.count(BLACK)
-        w = self.count(WHITE)
-        e = SIZE * SIZE - (b + w)
-        return b, w, e
+        b = self.black.bit_count()
+        w = self.white.bit_count()
+        return b, w, SIZE * SIZE - (b + w)
+
+    def _cells(self) -> str:
+        """All 64 cells as one row-major string of '.', 'B', 'W'."""
+        buf = bytearray(EMPTY.encode() * (SIZE * SIZE))
+        for sq in iter_bits(self.black):
+            buf[sq] = ord(BLACK)
+        for sq in iter_bits(self.white):
+            buf[sq] = ord(WHITE)
+        return buf.decode()
 
     # Pretty string for quick debugging
     def __str__(self) -> str:  # pragma: no cover (cosmetic)
-        header = "   " + " ".join(str(c) for c in range(SIZE))
-        lines = [header]
-        for r in range(SIZE):
-            lines.append(f"{r}  " + " ".join(self.grid[r]))
+        cells = self._cells()
+        lines = [_STR_HEADER]
+        lines.extend(
+            f"{r}  " + " ".join(cells[r * SIZE:(r + 1) * SIZE]) for r in range(SIZE)
+        )
         b, w, e = self.counts()
         lines.append(f"B={b} W={w} E={e}")
         return "\n".join(lines)
@@ -1,14 +1,21 @@
 # reversi/game/outcome.py
 # Zachary Chan c3468750
 from __future__ import annotations
-from typing import Literal
+from typing import Literal, Tuple
 
 from .board import BLACK, WHITE
-from .rules import score
 from ..protocol import YOU_WIN, YOU_LOSE, DRAW
 
 Token = Literal["YOU WIN", "YOU LOSE", "DRAW"]
 
+# What the peer should send me, given the token I would send it
+_MIRROR = {YOU_WIN: YOU_LOSE, YOU_LOSE: YOU_WIN, DRAW: DRAW}
+
+def _my_margin(board, my_color: str) -> int:
+    """My discs minus the peer's, straight from the bitboard popcounts."""
+    diff = board.black.bit_count() - board.white.bit_count()
+    return diff if my_color == BLACK else -diff
+
 def outcome_token_for(board, my_color: str) -> Token:
     """
     Token to SEND TO THE PEER per spec (peer-addressed).
@@ -16,25 +23,27 @@ def outcome_token_for(board, my_color: str) -> Token:
     - If draw: "DRAW"
     - If I am winning: "YOU LOSE"
     """
-    b, w = score(board)
-    if b == w:
+    margin = _my_margin(board, my_color)
+    if margin == 0:
         return DRAW
-    if my_color == BLACK:
-        # If Black is winning, peer (White) loses
-        return YOU_LOSE if b > w else YOU_WIN
-    else:  # my_color == WHITE
-        return YOU_LOSE if w > b else YOU_WIN
+    # If I am winning, the peer loses
+    return YOU_LOSE if margin > 0 else YOU_WIN
 
 def verify_peer_outcome(board, my_color: str, peer_token: Token) -> bool:
     """
     Verify a token RECEIVED FROM PEER (which is addressed to ME).
     If I receive "YOU WIN", I should actually be winning, etc.
     """
-    b, w = score(board)
+    margin = _my_margin(board, my_color)
     if peer_token == DRAW:
-        return b == w
-    if my_color == BLACK:
-        # Received "YOU WIN" means Black is winning
-        return (b > w) if peer_token == YOU_WIN else (w > b)
-    else:  # WHITE
-        return (w > b) if peer_token == YOU_WIN else (b > w)
+        return margin == 0
+    # Received "YOU WIN" means I am winning
+    return (margin > 0) if peer_token == YOU_WIN else (margin < 0)
+
+def outcome_compare(board, my_color: str, peer_token: str) -> Tuple[bool, Token]:
+    """
+    verify_peer_outcome plus the token I would send, from one scoring pass:
+    (peer_token is consistent, outcome_token_for(board, my_color)).
+    """
+    mine = outcome_token_for(board, my_color)
+    return peer_token == _MIRROR[mine], mine
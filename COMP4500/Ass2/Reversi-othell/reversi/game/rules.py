@@ -1,86 +1,198 @@
 # reversi/game/rules.py
 # Zachary Chan c3468750
 from __future__ import annotations
-from typing import Iterable, List, Optional, Sequence, Tuple
+from typing import List, Optional, Tuple
 from .board import (
     Board,
     BLACK,
     WHITE,
-    EMPTY,
     SIZE,
-    in_bounds,
-    opponent,
+    ZOBRIST,
+    ZOBRIST_SWAP,
+    iter_bits,
 )
 from ..errors import IllegalMoveError
 
-# Directions: N, NE, E, SE, S, SW, W, NW
+# Directions: N, NE, E, SE, S, SW, W, NW (not used by the bitboard kernels;
+# kept exported for callers)
 DIRS: Tuple[Tuple[int, int], ...] = (
     (-1, 0), (-1, 1), (0, 1), (1, 1),
     (1, 0), (1, -1), (0, -1), (-1, -1),
 )
 
 
-def _line_flips(board: Board, player: str, r: int, c: int, dr: int, dc: int) -> List[Tuple[int, int]]:
-    """
-    If placing at (r,c) brackets opponent stones along (dr,dc),
-    return list of coordinates to flip along that ray; else [].
-    """
-    flips: List[Tuple[int, int]] = []
-    rr, cc = r + dr, c + dc
-    opp = opponent(player)
+# 64-bit wrap-around mask (Python ints are unbounded)
+FULL = 0xFFFFFFFFFFFFFFFF
+
+
+def _bitboards(board: Board, player: str) -> Tuple[int, int]:
+    """(player_bb, opponent_bb) for the side `player`."""
+    if player == BLACK:
+        return board.black, board.white
+    if player == WHITE:
+        return board.white, board.black
+    raise ValueError(f"Invalid player: {player!r}")
+
 
-    if not in_bounds(rr, cc) or board.cell(rr, cc) != opp:
-        return []  # immediate neighbor must be opponent
+# REV_BYTE[i] is byte i with its 8 bits in reverse order
+_REV_BYTE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
 
-    # Collect opponent stones until we see our own stone
-    while in_bounds(rr, cc):
-        cell = board.cell(rr, cc)
-        if cell == opp:
-            flips.append((rr, cc))
-        elif cell == player:
-            return flips  # bracketed successfully
-        else:  # EMPTY
-            return []
-        rr += dr
-        cc += dc
-    return []  # ran off board without closing bracket
+
+def rotate_180(x: int) -> int:
+    """Rotate a bitboard 180 degrees: square sq moves to sq ^ 63 (full 64-bit reverse)."""
+    return int.from_bytes(x.to_bytes(8, "little").translate(_REV_BYTE), "big")
+
+
+def _ray(sq: int, dr: int, dc: int) -> int:
+    """Mask of the squares from `sq` (exclusive) to the board edge along (dr,dc)."""
+    m = 0
+    r, c = divmod(sq, SIZE)
+    r, c = r + dr, c + dc
+    while 0 <= r < SIZE and 0 <= c < SIZE:
+        m |= 1 << (r * SIZE + c)
+        r, c = r + dr, c + dc
+    return m
+
+
+# Per-square ray tables, built once at import.
+# _RAYS_UP[sq]: E, S, SE, SW (towards higher bits).
+# _RAYS_DOWN[sq]: W, N, NW, NE, i.e. the forward rays of sq ^ 63 rotated 180 degrees.
+_RAYS_UP: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(_ray(sq, dr, dc) for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)))
+    for sq in range(SIZE * SIZE)
+)
+_RAYS_DOWN: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(rotate_180(ray) for ray in _RAYS_UP[sq ^ 63])
+    for sq in range(SIZE * SIZE)
+)
+
+
+def calc_flip(player: int, opponent: int, sq: int) -> int:
+    """
+    Bitboard of opponent stones flipped when `player` plays on square `sq`
+    (bit index r*8 + c). Returns 0 if the move flips nothing (illegal).
+    Does not check that `sq` is empty.
+
+    Along each ray, the first non-opponent square must be the player's;
+    the opponent stones before it are flipped.
+    """
+    flip = 0
+    for ray in _RAYS_UP[sq]:
+        stop = ray & ~opponent
+        if stop:
+            first = stop & -stop  # nearest = lowest bit
+            if first & player:
+                flip |= (first - 1) & ray
+    for ray in _RAYS_DOWN[sq]:
+        stop = ray & ~opponent
+        if stop:
+            first = 1 << (stop.bit_length() - 1)  # nearest = highest bit
+            if first & player:
+                flip |= ray & -(first << 1)
+    return flip
 
 
 def flips_for_move(board: Board, player: str, r: int, c: int) -> List[Tuple[int, int]]:
     """
     Returns list of all stones to flip if player plays at (r,c), or [] if illegal.
     """
-    if not in_bounds(r, c) or board.cell(r, c) != EMPTY:
+    if (r | c) & ~7:
         return []
-    flips: List[Tuple[int, int]] = []
-    for dr, dc in DIRS:
-        flips.extend(_line_flips(board, player, r, c, dr, dc))
-    return flips
+    me, opp = _bitboards(board, player)
+    sq = r * SIZE + c
+    if (me | opp) >> sq & 1:
+        return []
+    flip = calc_flip(me, opp, sq)
+    return [(f >> 3, f & 7) for f in iter_bits(flip)]
 
 
-def valid_moves(board: Board, player: str) -> List[Tuple[int, int]]:
+def legal_moves_bb(player: int, opponent: int) -> int:
     """
-    All legal coordinates where placing a stone flips at least one opponent stone.
+    Bitboard of every legal move for `player`. For each direction, smear the
+    player's stones across adjacent opponent runs (at most 6 long), then one
+    more step onto an empty square.
+
+    Unrolled: each block handles one line orientation in both directions
+    (shift left and right by the same amount). Masking the opponent stones
+    off the edge files/ranks for that orientation stops wrap-around.
     """
-    out: List[Tuple[int, int]] = []
-    # Small optimization: only consider empties adjacent to at least one opponent stone.
-    opp = opponent(player)
-    adj_candidates: set[Tuple[int, int]] = set()
-    for r in range(SIZE):
-        for c in range(SIZE):
-            if board.cell(r, c) == opp:
-                for dr, dc in DIRS:
-                    rr, cc = r + dr, c + dc
-                    if in_bounds(rr, cc) and board.cell(rr, cc) == EMPTY:
-                        adj_candidates.add((rr, cc))
+    empty = ~(player | opponent) & FULL
+
+    # E / W (shift 1)
+    o = opponent & 0x7E7E7E7E7E7E7E7E
+    fl = o & (player << 1); fr = o & (player >> 1)
+    fl |= o & (fl << 1);    fr |= o & (fr >> 1)
+    fl |= o & (fl << 1);    fr |= o & (fr >> 1)
+    fl |= o & (fl << 1);    fr |= o & (fr >> 1)
+    fl |= o & (fl << 1);    fr |= o & (fr >> 1)
+    fl |= o & (fl << 1);    fr |= o & (fr >> 1)
+    moves = (fl << 1) | (fr >> 1)
+
+    # S / N (shift 8)
+    o = opponent & 0x00FFFFFFFFFFFF00
+    fl = o & (player << 8); fr = o & (player >> 8)
+    fl |= o & (fl << 8);    fr |= o & (fr >> 8)
+    fl |= o & (fl << 8);    fr |= o & (fr >> 8)
+    fl |= o & (fl << 8);    fr |= o & (fr >> 8)
+    fl |= o & (fl << 8);    fr |= o & (fr >> 8)
+    fl |= o & (fl << 8);    fr |= o & (fr >> 8)
+    moves |= (fl << 8) | (fr >> 8)
+
+    # SW / NE (shift 7)
+    o = opponent & 0x007E7E7E7E7E7E00
+    fl = o & (player << 7); fr = o & (player >> 7)
+    fl |= o & (fl << 7);    fr |= o & (fr >> 7)
+    fl |= o & (fl << 7);    fr |= o & (fr >> 7)
+    fl |= o & (fl << 7);    fr |= o & (fr >> 7)
+    fl |= o & (fl << 7);    fr |= o & (fr >> 7)
+    fl |= o & (fl << 7);    fr |= o & (fr >> 7)
+    moves |= (fl << 7) | (fr >> 7)
 
-    for (r, c) in adj_candidates:
-        if flips_for_move(board, player, r, c):
-            out.append((r, c))
+    # SE / NW (shift 9), same edge mask as the other diagonal
+    fl = o & (player << 9); fr = o & (player >> 9)
+    fl |= o & (fl << 9);    fr |= o & (fr >> 9)
+    fl |= o & (fl << 9);    fr |= o & (fr >> 9)
+    fl |= o & (fl << 9);    fr |= o & (fr >> 9)
+    fl |= o & (fl << 9);    fr |= o & (fr >> 9)
+    fl |= o & (fl << 9);    fr |= o & (fr >> 9)
+    moves |= (fl << 9) | (fr >> 9)
 
-    # Deterministic order (row-major)
-    out.sort()
-    return out
+    return moves & empty
+
+
+# The pure-Python kernels above are the reference implementation. Prefer a
+# compiled port when one is available: the Cython extension (if built), then
+# numba (if installed).
+py_calc_flip = calc_flip
+py_legal_moves_bb = legal_moves_bb
+try:
+    from .rules_c import calc_flip, legal_moves_bb
+except ImportError:
+    try:
+        from .rules_nb import calc_flip, legal_moves_bb
+    except ImportError:
+        pass
+
+
+def valid_moves_bb(board: Board, player: str) -> int:
+    """
+    Legal moves for `player` as a bitboard (bit index r*8 + c).
+    Cached on the board, so valid_moves / has_any_move / is_game_over on the
+    same position only generate moves once per player.
+    """
+    cache = board._legal
+    moves = cache.get(player)
+    if moves is None:
+        moves = cache[player] = legal_moves_bb(*_bitboards(board, player))
+    return moves
+
+
+def valid_moves(board: Board, player: str) -> List[Tuple[int, int]]:
+    """
+    All legal coordinates where placing a stone flips at least one opponent stone.
+    Row-major order.
+    """
+    return [(sq >> 3, sq & 7) for sq in iter_bits(valid_moves_bb(board, player))]
 
 
 def apply_move(board: Board, player: str, r: int, c: int) -> Board:
@@ -88,38 +200,46 @@ def apply_move(board: Board, player: str, r: int, c: int) -> Board:
     Returns a NEW Board with the move applied (pure/immutable).
     Raises IllegalMoveError if the move is not legal.
     """
-    flips = flips_for_move(board, player, r, c)
-    if not flips:
+    me, opp = _bitboards(board, player)
+    sq = r * SIZE + c
+    move = 0 if (r | c) & ~7 else 1 << sq
+    flip = calc_flip(me, opp, sq) if move and not (me | opp) & move else 0
+    if not flip:
         raise IllegalMoveError(f"Illegal move for {player} at {(r, c)}")
 
-    rows = board.to_rows()
-    rows[r][c] = player
-    for rr, cc in flips:
-        rows[rr][cc] = player
-    return Board.from_rows(rows)
+    # Incremental Zobrist: add the new stone, swap colour of every flipped one
+    z = board.zobrist ^ ZOBRIST[sq][0 if player == BLACK else 1]
+    for f in iter_bits(flip):
+        z ^= ZOBRIST_SWAP[f]
+
+    if player == BLACK:
+        return Board(me | flip | move, opp ^ flip, z)
+    return Board(opp ^ flip, me | flip | move, z)
 
 
 def has_any_move(board: Board, player: str) -> bool:
-    return len(valid_moves(board, player)) > 0
+    return valid_moves_bb(board, player) != 0
 
 
-def is_game_over(board: Board) -> bool:
+def is_game_over(board: Board, side_to_move: Optional[str] = None) -> bool:
     """
     In Othello, the game ends when neither player has a legal move
     or the board is full.
+    Pass `side_to_move` to test that side first: mid-game it almost always
+    has a move, so the other side's moves are never generated.
     """
-    b, w, e = board.counts()
-    if e == 0:
+    if not ~(board.black | board.white) & FULL:
         return True
-    return not (has_any_move(board, BLACK) or has_any_move(board, WHITE))
+    first = side_to_move or BLACK
+    second = WHITE if first == BLACK else BLACK
+    return not (has_any_move(board, first) or has_any_move(board, second))
 
 
 def score(board: Board) -> Tuple[int, int]:
     """
     Returns (black_count, white_count).
     """
-    b, w, _ = board.counts()
-    return b, w
+    return board.black.bit_count(), board.white.bit_count()
 
 
 # ---------- Built-in smoke test (standard library only) ----------
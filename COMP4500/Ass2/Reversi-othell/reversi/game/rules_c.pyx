@@ -0,0 +1,75 @@
+# reversi/game/rules_c.pyx
+# Zachary Chan c3468750
+# cython: language_level=3
+"""
+C-compiled bitboard kernels (optional). Build in place from Reversi-othell/ with:
+
+    CFLAGS="-O3 -march=native" cythonize -i reversi/game/rules_c.pyx
+
+Same contracts as rules.calc_flip / rules.legal_moves_bb. rules.py prefers
+this module, then rules_nb (numba), then its own pure-Python kernels.
+"""
+
+ctypedef unsigned long long u64
+
+# Opponent masks per line orientation (see rules_nb.py)
+cdef u64 MASK_H = 0x7E7E7E7E7E7E7E7EULL  # E / W
+cdef u64 MASK_V = 0x00FFFFFFFFFFFF00ULL  # N / S
+cdef u64 MASK_D = 0x007E7E7E7E7E7E00ULL  # diagonals
+
+
+cdef inline u64 _flip_line(u64 move, u64 player, u64 om, int k) noexcept nogil:
+    cdef u64 flip = 0
+    cdef u64 t = (move << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    if (t << k) & player:
+        flip |= t
+    t = (move >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    if (t >> k) & player:
+        flip |= t
+    return flip
+
+
+cdef inline u64 _moves_line(u64 player, u64 om, int k) noexcept nogil:
+    cdef u64 fl = om & (player << k)
+    cdef u64 fr = om & (player >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    return (fl << k) | (fr >> k)
+
+
+cpdef u64 calc_flip(u64 player, u64 opponent, int sq) noexcept nogil:
+    cdef u64 move = 1ULL << sq
+    return (
+        _flip_line(move, player, opponent & MASK_H, 1)
+        | _flip_line(move, player, opponent & MASK_V, 8)
+        | _flip_line(move, player, opponent & MASK_D, 7)
+        | _flip_line(move, player, opponent & MASK_D, 9)
+    )
+
+
+cpdef u64 legal_moves_bb(u64 player, u64 opponent) noexcept nogil:
+    cdef u64 moves = (
+        _moves_line(player, opponent & MASK_H, 1)
+        | _moves_line(player, opponent & MASK_V, 8)
+        | _moves_line(player, opponent & MASK_D, 7)
+        | _moves_line(player, opponent & MASK_D, 9)
+    )
+    return moves & ~(player | opponent)
@@ -0,0 +1,103 @@
+# reversi/game/rules_nb.py
+# Zachary Chan c3468750
+"""
+Numba-compiled bitboard kernels (optional; needs numba + numpy).
+
+Same contracts as rules.calc_flip / rules.legal_moves_bb, plus a batched
+legal-move generator for bulk / self-play use. rules.py picks these up
+automatically when numba is installed; the pure-Python versions there stay
+the reference.
+
+All arithmetic is uint64: mixing signed and unsigned ints in numba promotes
+to float, so every constant below is an np.uint64.
+"""
+import numpy as np
+from numba import njit, prange
+
+_U = np.uint64
+_ZERO = _U(0)
+_ONE = _U(1)
+
+# Opponent masks per line orientation; stones on the excluded edge can never
+# be flanked along that orientation, and masking them stops shifts wrapping.
+_MASK_H = _U(0x7E7E7E7E7E7E7E7E)  # E / W
+_MASK_V = _U(0x00FFFFFFFFFFFF00)  # N / S
+_MASK_D = _U(0x007E7E7E7E7E7E00)  # diagonals
+
+_S1 = _U(1)
+_S7 = _U(7)
+_S8 = _U(8)
+_S9 = _U(9)
+
+
+@njit("uint64(uint64, uint64, uint64, uint64)", cache=True)
+def _flip_line(move, player, om, k):
+    """Flips along one orientation (both directions) for shift amount k."""
+    flip = _ZERO
+    t = (move << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    t |= (t << k) & om
+    if (t << k) & player:
+        flip |= t
+    t = (move >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    t |= (t >> k) & om
+    if (t >> k) & player:
+        flip |= t
+    return flip
+
+
+@njit("uint64(uint64, uint64, int64)", cache=True)
+def calc_flip(player, opponent, sq):
+    move = _ONE << _U(sq)
+    return (
+        _flip_line(move, player, opponent & _MASK_H, _S1)
+        | _flip_line(move, player, opponent & _MASK_V, _S8)
+        | _flip_line(move, player, opponent & _MASK_D, _S7)
+        | _flip_line(move, player, opponent & _MASK_D, _S9)
+    )
+
+
+@njit("uint64(uint64, uint64, uint64)", cache=True)
+def _moves_line(player, om, k):
+    """Squares one past a player-anchored opponent run, both directions."""
+    fl = om & (player << k)
+    fr = om & (player >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    fl |= om & (fl << k)
+    fr |= om & (fr >> k)
+    return (fl << k) | (fr >> k)
+
+
+@njit("uint64(uint64, uint64)", cache=True)
+def legal_moves_bb(player, opponent):
+    moves = (
+        _moves_line(player, opponent & _MASK_H, _S1)
+        | _moves_line(player, opponent & _MASK_V, _S8)
+        | _moves_line(player, opponent & _MASK_D, _S7)
+        | _moves_line(player, opponent & _MASK_D, _S9)
+    )
+    return moves & ~(player | opponent)
+
+
+@njit("uint64[:](uint64[:], uint64[:])", parallel=True, cache=True)
+def batch_legal_moves(players, opponents):
+    """Legal-move bitboards for many positions (players[i] to move vs opponents[i])."""
+    n = players.shape[0]
+    out = np.empty(n, dtype=np.uint64)
+    for i in prange(n):
+        out[i] = legal_moves_bb(players[i], opponents[i])
+    return out
@@ -0,0 +1,38 @@
+# reversi/game/rules_np.py
+# Zachary Chan c3468750
+"""
+Vectorised legal-move generation over many positions at once (optional; needs numpy).
+
+Same shift-and-fill kernel as rules_nb / rules_c, but each step operates on
+whole uint64 arrays, so there is no Python loop over positions.
+"""
+import numpy as np
+
+_U = np.uint64
+
+# Opponent masks per line orientation (see rules_nb.py), with shift amount
+_LINES = (
+    (_U(0x7E7E7E7E7E7E7E7E), _U(1)),  # E / W
+    (_U(0x00FFFFFFFFFFFF00), _U(8)),  # N / S
+    (_U(0x007E7E7E7E7E7E00), _U(7)),  # SW / NE
+    (_U(0x007E7E7E7E7E7E00), _U(9)),  # SE / NW
+)
+
+
+def legal_moves_bulk(players, opponents) -> np.ndarray:
+    """
+    Legal-move bitboards for players[i] to move against opponents[i].
+    Accepts anything np.asarray can turn into a uint64 array; returns uint64[N].
+    """
+    p = np.asarray(players, dtype=np.uint64)
+    o = np.asarray(opponents, dtype=np.uint64)
+    moves = np.zeros_like(p)
+    for mask, k in _LINES:
+        om = o & mask
+        fl = om & np.left_shift(p, k)
+        fr = om & np.right_shift(p, k)
+        for _ in range(5):
+            fl |= om & np.left_shift(fl, k)
+            fr |= om & np.right_shift(fr, k)
+        moves |= np.left_shift(fl, k) | np.right_shift(fr, k)
+    return moves & ~(p | o)
@@ -2,20 +2,23 @@
 # Zachary Chan c3468750
 import argparse
 import ipaddress
+import json
 import logging
+import os
 import socket
 import sys
 from . import __version__
 
-from .game.outcome import outcome_token_for, verify_peer_outcome
+from .game.outcome import outcome_token_for, outcome_compare
 from .game.board import Board, BLACK, WHITE, opponent
 from .game.rules import valid_moves, apply_move, has_any_move, is_game_over, score
 from .UI.console import render_board, prompt_move, announce_pass, announce_winner
-from .net.udp_discovery import discover_and_connect
+from .net.udp_discovery import DiscoveryMode, discover_and_connect
 from .net.tcp_game import TcpGame
 from .protocol import (
-    encode_move, decode_move, parse_tcp_line, is_token,
-    PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR, MOVE
+    decode_move, parse_tcp_line, is_token, is_token_bytes, decode_token_bytes,
+    PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR, MOVE_PREFIX,
+    PASS_B, ERROR_B, MOVE_BYTES, TOKEN_BYTES,
 )
 from .errors import ProtocolError, IllegalMoveError
 
@@ -26,8 +29,33 @@ PORT_MIN = 9000
 PORT_MAX = 9100
 
 # Setup and Helper functions
-def setup_logging(verbose: bool) -> None:
+class JsonLineHandler(logging.Handler):
+    """
+    One compact JSON object per record, written straight to a file descriptor
+    (stderr by default, like basicConfig). Skips logging.Formatter entirely.
+    """
+
+    def __init__(self, fd: int = 2, level: int = logging.NOTSET):
+        super().__init__(level)
+        self.fd = fd
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            obj = {"t": record.created, "lvl": record.levelname,
+                   "name": record.name, "msg": record.getMessage()}
+            if record.exc_info:
+                obj["exc"] = logging.Formatter().formatException(record.exc_info)
+            data = (json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+            while data:
+                data = data[os.write(self.fd, data):]
+        except Exception:
+            self.handleError(record)
+
+def setup_logging(verbose: bool, log_json: bool = False) -> None:
     level = logging.DEBUG if verbose else logging.INFO
+    if log_json:
+        logging.basicConfig(level=level, handlers=[JsonLineHandler()])
+        return
     logging.basicConfig(
         level=level,
         format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
@@ -54,7 +82,7 @@ def valid_broadcast_port(port_s: str) -> int:
         )
     return port
 
-def parse_args(argv=None):
+def _build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         prog="reversi",
         description="Reversi (Othello) P2P client — console UI (hotseat) and scaffold",
@@ -69,6 +97,8 @@ def parse_args(argv=None):
                    help="Run local 2-player hotseat mode (no networking).")
     p.add_argument("--discover-window", type=float, default=5.0,
                help="Seconds to wait in each discovery/accept window (default: 5.0).")
+    p.add_argument("--discovery-mode", choices=("broadcast", "multicast"), default="broadcast",
+               help="Advertise by UDP broadcast (default) or to the link-local multicast group.")
     p.add_argument("--tcp-echo", action="store_true",
                help="After discovery, run a tiny TCP handshake (P1 sends HELLO, P2 replies ACK).")
     p.add_argument("--play", action="store_true",
@@ -79,8 +109,13 @@ def parse_args(argv=None):
                help="Optional path to write logs to (in addition to stdout).")
     p.add_argument("--trace-wire", action="store_true",
                help="Trace protocol SEND/RECV lines (safe for marking).")
+    return p
 
-    return p.parse_args(argv)
+# Built once at import; parse_args only parses
+_PARSER = _build_parser()
+
+def parse_args(argv=None):
+    return _PARSER.parse_args(argv)
 
 def _close_quiet(socklike):
     try:
@@ -88,12 +123,16 @@ def _close_quiet(socklike):
     except Exception:
         pass
 
-def _send_error_and_close(tg: TcpGame, log_reason: str) -> int:
-    LOG.error("Protocol error: %s", log_reason)
+def _try_send_error(tg: TcpGame) -> None:
+    # Best-effort courtesy ERROR so the other side doesn't hang
     try:
-        tg.send_line(ERROR)
+        tg.send_bytes_line(ERROR_B)
     except Exception:
         pass
+
+def _send_error_and_close(tg: TcpGame, log_reason: str) -> int:
+    LOG.error("Protocol error: %s", log_reason)
+    _try_send_error(tg)
     _close_quiet(tg)
     return 1
 
@@ -104,160 +143,166 @@ def require_broadcast_args(args):
             "Error: --broadcast-addr and --broadcast-port are required unless --hotseat is set."
         )
 def _send_outcome_and_close(tg: TcpGame, my_color: str, board: Board) -> int:
-    # Compute my perspective and send it, then close (peer will verify on receipt).
+    # Compute my perspective and send it (with any queued MOVE/PASS), then close
+    # (peer will verify on receipt).
     tok = outcome_token_for(board, my_color)
     try:
-        tg.send_line(tok)
+        tg.send_bytes_line(TOKEN_BYTES[tok])
     finally:
         announce_winner(*score(board))
         tg.close()
     return 0
 
 # the actual game loops
-def run_network_game(broadcast_addr: str, broadcast_port: int, window: float = 5.0) -> int:
+def run_network_game(broadcast_addr: str, broadcast_port: int, window: float = 5.0,
+                     *, echo: bool = False, discovery_mode: DiscoveryMode = "broadcast") -> int:
     LOG.info("Starting discovery window (%.1fs)…", window)
-    role, sock, peer, gport = discover_and_connect(broadcast_addr, broadcast_port, window=window)
+    role, sock, peer, gport = discover_and_connect(
+        broadcast_addr, broadcast_port, window=window, discovery_mode=discovery_mode
+    )
     LOG.info("Matched! role=%s  peer=%s  gameplay_port=%s", role, peer, gport)
 
     tg = TcpGame.from_connected(sock)
-    tg.set_timeout(300.0)
+    if echo:
+        LOG.info("Starting TCP echo handshake…")
+    else:
+        tg.set_timeout(300.0)
     try:
-        board = Board.initial()
-        my_color  = BLACK if role == "P1" else WHITE
-        opp_color = WHITE if my_color == BLACK else BLACK
-        to_move = BLACK  # Reversi: BLACK starts (Player 1)
-        move_num = 1
-        consecutive_passes = 0
+        return _play_networked(tg, role, echo=echo)
+    except KeyboardInterrupt:
+        _try_send_error(tg)
+        LOG.warning("Interrupted by user (Ctrl+C).")
+        return 1
+    finally:
+        # Safety close if still open
+        _close_quiet(tg)
+
 
-        while True:
-            render_board(board, to_move, move_num)
-
-            # If board already terminal (full/no moves), finish with outcome exchange
-            if is_game_over(board):
-                return _send_outcome_and_close(tg, my_color, board)
-
-            if to_move == my_color:
-                # ----- My turn -----
-                moves = valid_moves(board, my_color)
-                if not moves:
-                    announce_pass(my_color)
-                    tg.send_line(PASS)
-                    consecutive_passes += 1
-
-                    # If opponent also cannot move, end the game now
-                    if not has_any_move(board, opp_color) or consecutive_passes >= 2:
-                        return _send_outcome_and_close(tg, my_color, board)
-
-                    # Hand over turn
-                    to_move = opp_color
-                    continue
-
-                # Have legal moves: prompt strictly from this list
-                choice = prompt_move(board, my_color, moves)
-                if choice is None:
-                    # User bailed; send ERROR to avoid leaving peer hanging
-                    try:
-                        tg.send_line(ERROR)
-                    except Exception:
-                        pass
-                    tg.close()
-                    LOG.info("User quit. Exiting.")
-                    return 0
-
-                r, c = moves[choice]
-                # Apply locally (cannot raise)
-                board = apply_move(board, my_color, r, c)
-                move_num += 1
-                consecutive_passes = 0
-
-                # Send to peer
-                tg.send_line(encode_move(r, c))
+def _play_networked(tg: TcpGame, role: str, *, echo: bool = False) -> int:
+    """
+    Turn loop for a networked game over an already-matched connection.
+    `echo` (the --tcp-echo transport test) only changes how a local quit is
+    reported: as a protocol error (exit 1) rather than a clean exit.
+    """
+    board = Board.initial()
+    my_color  = BLACK if role == "P1" else WHITE
+    opp_color = opponent(my_color)
+    to_move = BLACK  # Reversi: BLACK starts (Player 1)
+    move_num = 1
+    consecutive_passes = 0
+
+    while True:
+        render_board(board, to_move, move_num)
+
+        # If board already terminal (full/no moves), finish with outcome exchange
+        if is_game_over(board, to_move):
+            return _send_outcome_and_close(tg, my_color, board)
+
+        if to_move == my_color:
+            # ----- My turn -----
+            moves = valid_moves(board, my_color)
+            if not moves:
+                announce_pass(my_color)
+                tg.queue_bytes_line(PASS_B)  # rides with the outcome or flushes before our next recv
+                consecutive_passes += 1
+
+                # If opponent also cannot move, end the game now
+                if not has_any_move(board, opp_color) or consecutive_passes >= 2:
+                    return _send_outcome_and_close(tg, my_color, board)
 
                 # Hand over turn
                 to_move = opp_color
+                continue
+
+            # Have legal moves: prompt strictly from this list
+            choice = prompt_move(board, my_color, moves)
+            if choice is None:
+                if echo:
+                    return _send_error_and_close(tg, "user aborted on own turn")
+                # User bailed; send ERROR to avoid leaving peer hanging
+                _try_send_error(tg)
+                _close_quiet(tg)
+                LOG.info("User quit. Exiting.")
+                return 0
 
-            else:
-                # ----- Opponent's turn -----
-                try:
-                    line = tg.recv_line()
-                except ProtocolError as e:
-                    LOG.error("Receive failed: %s", e)
-                    tg.close()
-                    return 1
-
-                # Handle tokens and moves
-                if line == PASS:
-                    announce_pass(opp_color)
-                    consecutive_passes += 1
-
-                    if not has_any_move(board, my_color) or consecutive_passes >= 2:
-                        # Double pass: compute outcome and send (from my side)
-                        return _send_outcome_and_close(tg, my_color, board)
-
-                    # I get the turn now
-                    to_move = my_color
-                    continue
-
-                # Outcome tokens (peer might end the game first). Verify and exit.
-                if is_token(line) and line in (YOU_WIN, YOU_LOSE, DRAW):
-                    ok = verify_peer_outcome(board, my_color, line)
-                    if not ok:
-                        # Peer’s token disagrees with our computed result → send ERROR and close.
-                        try:
-                            tg.send_line(ERROR)
-                        finally:
-                            tg.close()
-                        LOG.error("Outcome mismatch: peer sent %r; local says %r",
-                                line, outcome_token_for(board, my_color))
-                        return 1
-                    # Consistent outcome — accept and exit cleanly.
-                    announce_winner(*score(board))
-                    tg.close()
-                    return 0
-
-
-                # Expect a MOVE
-                if not line.startswith(f"{MOVE}:"):
-                    # Unexpected message → error and exit
-                    try:
-                        tg.send_line(ERROR)
-                    finally:
-                        tg.close()
-                    LOG.error("Unexpected message from peer: %r", line)
-                    return 1
-
-                # Decode and validate opponent move
-                try:
-                    msg = decode_move(line)
-                except ProtocolError:
-                    try:
-                        tg.send_line(ERROR)
-                    finally:
-                        tg.close()
-                    LOG.error("Malformed MOVE from peer: %r", line)
-                    return 1
-
-                try:
-                    board = apply_move(board, opp_color, msg.row, msg.col)
-                except IllegalMoveError:
-                    try:
-                        tg.send_line(ERROR)
-                    finally:
-                        tg.close()
-                    LOG.error("Illegal MOVE from peer at (%s,%s)", msg.row, msg.col)
-                    return 1
-
-                move_num += 1
-                consecutive_passes = 0
-                # Hand over turn to me
+            r, c = moves[choice]
+            # Apply locally (cannot raise)
+            board = apply_move(board, my_color, r, c)
+            move_num += 1
+            consecutive_passes = 0
+
+            # Queue for the peer: if this move ends the game it goes out in the
+            # same write as the outcome token, otherwise before our next recv
+            tg.queue_bytes_line(MOVE_BYTES[(r, c)])
+
+            # Hand over turn
+            to_move = opp_color
+
+        else:
+            # ----- Opponent's turn -----
+            try:
+                raw = tg.recv_line_bytes()
+                # Tokens are matched on the wire bytes; only MOVE lines get decoded
+                if is_token_bytes(raw):
+                    line = decode_token_bytes(raw).kind
+                else:
+                    line = raw.decode("utf-8", errors="strict")
+            except (ProtocolError, UnicodeDecodeError) as e:
+                LOG.error("Receive failed: %s", e)
+                _close_quiet(tg)
+                return 1
+
+            # ERROR from peer: print & exit
+            if line == ERROR:
+                LOG.error("Received ERROR from peer. Exiting.")
+                _close_quiet(tg)
+                return 1
+
+            # Handle tokens and moves
+            if line == PASS:
+                announce_pass(opp_color)
+                consecutive_passes += 1
+
+                if not has_any_move(board, my_color) or consecutive_passes >= 2:
+                    # Double pass: compute outcome and send (from my side)
+                    return _send_outcome_and_close(tg, my_color, board)
+
+                # I get the turn now
                 to_move = my_color
+                continue
+
+            # Outcome tokens (peer might end the game first). Verify and exit.
+            if is_token(line) and line in (YOU_WIN, YOU_LOSE, DRAW):
+                ok, mine = outcome_compare(board, my_color, line)
+                if not ok:
+                    # Peer’s token disagrees with our computed result → send ERROR and close.
+                    return _send_error_and_close(
+                        tg, f"outcome mismatch: peer sent {line!r}, local expects {mine!r}"
+                    )
+                # Consistent outcome — accept and exit cleanly.
+                announce_winner(*score(board))
+                _close_quiet(tg)
+                return 0
 
-    finally:
-        # Safety close if still open
-        try:
-            tg.close()
-        except Exception:
-            pass
+            # Expect a MOVE
+            if not line.startswith(MOVE_PREFIX):
+                return _send_error_and_close(tg, f"unexpected message from peer: {line!r}")
+
+            # Decode and validate opponent move
+            try:
+                msg = decode_move(line)
+            except ProtocolError:
+                return _send_error_and_close(tg, f"malformed MOVE from peer: {line!r}")
+
+            try:
+                board = apply_move(board, opp_color, msg.row, msg.col)
+            except IllegalMoveError:
+                return _send_error_and_close(tg, f"illegal MOVE from peer at ({msg.row},{msg.col})")
+
+            move_num += 1
+            consecutive_passes = 0
+            # Hand over turn to me
+            to_move = my_color
 
 
     
@@ -279,25 +324,26 @@ def run_hotseat() -> int:
         render_board(board, player, move_number)
 
         # Check if the board/game is already over
-        if is_game_over(board):
+        if is_game_over(board, player):
             b, w = score(board)
             announce_winner(b, w)
             return 0
 
         moves = valid_moves(board, player)
+        other = opponent(player)
 
         if not moves:
             # Auto-pass for this player
             consecutive_passes += 1
             announce_pass(player)
             # If both players passed in a row → end
-            other_can_move = has_any_move(board, BLACK if player == WHITE else WHITE)
+            other_can_move = has_any_move(board, other)
             if not other_can_move or consecutive_passes >= 2:
                 b, w = score(board)
                 announce_winner(b, w)
                 return 0
             # Switch player
-            player = WHITE if player == BLACK else BLACK
+            player = other
             continue
 
         # We have at least one legal move — prompt user to pick
@@ -309,13 +355,13 @@ def run_hotseat() -> int:
 
         r, c = moves[choice]
         board = apply_move(board, player, r, c)
-        player = WHITE if player == BLACK else BLACK
+        player = other
         move_number += 1
 
 # Runnable main
 def main(argv=None) -> int:
     args = parse_args(argv)
-    setup_logging(args.verbose)
+    setup_logging(args.verbose, log_json=args.log_json)
 
     LOG.info("Reversi v%s starting…", __version__)
     if args.hotseat:
@@ -324,132 +370,21 @@ def main(argv=None) -> int:
     # Networked mode
     if args.play:
         require_broadcast_args(args)
-        return run_network_game(args.broadcast_addr, args.broadcast_port, window=5.0)
+        return run_network_game(args.broadcast_addr, args.broadcast_port, window=5.0,
+                                discovery_mode=args.discovery_mode)
 
-   # Networking path
-    if args.discover or args.tcp_echo:
+    # Transport test: same game loop, short timeouts
+    if args.tcp_echo:
         require_broadcast_args(args)
-        from .net.udp_discovery import discover_and_connect
-        from .net.tcp_game import TcpGame
-        LOG.info("Starting discovery window (%.1fs)…", 5.0)
-        role, sock, peer, gport = discover_and_connect(args.broadcast_addr, args.broadcast_port, window=5.0)
-        LOG.info("Matched! role=%s  peer=%s  gameplay_port=%s", role, peer, gport)
-
-        if args.tcp_echo:
-            LOG.info("Starting TCP echo handshake…")
-            tg = TcpGame.from_connected(sock)
-            try:
-                board = Board.initial()
-                my_color  = BLACK if role == "P1" else WHITE
-                opp_color = WHITE if my_color == BLACK else BLACK
-                to_move = BLACK
-                move_num = 1
-                consecutive_passes = 0
-
-                while True:
-                    render_board(board, to_move, move_num)
-
-                    if is_game_over(board):
-                        return _send_outcome_and_close(tg, my_color, board)
-
-                    if to_move == my_color:
-                        # ----- My turn -----
-                        moves = valid_moves(board, my_color)
-                        if not moves:
-                            announce_pass(my_color)
-                            tg.send_line(PASS)
-                            consecutive_passes += 1
-                            if not has_any_move(board, opp_color) or consecutive_passes >= 2:
-                                return _send_outcome_and_close(tg, my_color, board)
-                            to_move = opp_color
-                            continue
-
-                        choice = prompt_move(board, my_color, moves)
-                        if choice is None:
-                            # user aborted → send ERROR and exit
-                            return _send_error_and_close(tg, "user aborted on own turn")
-
-                        r, c = moves[choice]
-                        board = apply_move(board, my_color, r, c)
-                        move_num += 1
-                        consecutive_passes = 0
-                        tg.send_line(encode_move(r, c))
-                        to_move = opp_color
-
-                    else:
-                        # ----- Opponent's turn -----
-                        try:
-                            line = tg.recv_line()
-                        except ProtocolError as e:
-                            LOG.error("Receive failed: %s", e)
-                            _close_quiet(tg)
-                            return 1
-
-                        # ERROR from peer: print & exit
-                        if line == ERROR:
-                            LOG.error("Received ERROR from peer. Exiting.")
-                            _close_quiet(tg)
-                            return 1
-
-                        # PASS from peer
-                        if line == PASS:
-                            announce_pass(opp_color)
-                            consecutive_passes += 1
-                            if not has_any_move(board, my_color) or consecutive_passes >= 2:
-                                return _send_outcome_and_close(tg, my_color, board)
-                            to_move = my_color
-                            continue
-
-                        # Outcome tokens: verify against my board
-                        if is_token(line) and line in (YOU_WIN, YOU_LOSE, DRAW):
-                            ok = verify_peer_outcome(board, my_color, line)
-                            if not ok:
-                                return _send_error_and_close(
-                                    tg,
-                                    f"outcome mismatch: peer sent {line!r}, local expects {outcome_token_for(board, my_color)!r}",
-                                )
-                            announce_winner(*score(board))
-                            _close_quiet(tg)
-                            return 0
-
-                        # Expect MOVE:r,c
-                        if not line.startswith(f"{MOVE}:"):
-                            return _send_error_and_close(tg, f"unexpected message from peer: {line!r}")
-
-                        # Decode & validate coordinates
-                        try:
-                            msg = decode_move(line)
-                        except ProtocolError:
-                            return _send_error_and_close(tg, f"malformed MOVE from peer: {line!r}")
-
-                        # Apply the opponent move against my local rules
-                        try:
-                            board = apply_move(board, opp_color, msg.row, msg.col)
-                        except IllegalMoveError:
-                            return _send_error_and_close(tg, f"illegal MOVE from peer at ({msg.row},{msg.col})")
-
-                        move_num += 1
-                        consecutive_passes = 0
-                        to_move = my_color
-
-            except KeyboardInterrupt:
-                # Best-effort courtesy ERROR so the other side doesn’t hang
-                try:
-                    tg.send_line(ERROR)
-                except Exception:
-                    pass
-                _close_quiet(tg)
-                LOG.warning("Interrupted by user (Ctrl+C).")
-                return 1
-
-
-        # Default discover-only path: just close.
-        # Default scaffold
-        require_broadcast_args(args)
-        LOG.info("Broadcast addr: %s", args.broadcast_addr)
-        LOG.info("Broadcast port: %s", args.broadcast_port)
-        LOG.info("Use --hotseat to play locally, --play to play over network, or --discover/--tcp-echo for transport tests.")
-        return 0
+        return run_network_game(args.broadcast_addr, args.broadcast_port, window=5.0, echo=True,
+                                discovery_mode=args.discovery_mode)
+
+    # Default scaffold
+    require_broadcast_args(args)
+    LOG.info("Broadcast addr: %s", args.broadcast_addr)
+    LOG.info("Broadcast port: %s", args.broadcast_port)
+    LOG.info("Use --hotseat to play locally, --play to play over network, or --tcp-echo for transport tests.")
+    return 0
 
 if __name__ == "__main__":
     sys.exit(main())
@@ -2,15 +2,31 @@
 # Zachary Chan c3468750
 from __future__ import annotations
 
+import selectors
 import socket
-from typing import Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
 
 from ..errors import ProtocolError
 
 
 _DEFAULT_TIMEOUT = 5.0          # seconds per socket op
 _MAX_LINE_LEN = 1024            # guardrail against absurdly long lines
+_RECV_SIZE = 65536              # one read drains everything the peer has pipelined
+_COMPACT_AT = 4096              # consumed-prefix size worth shifting out of _rbuf
 _EOL = b"\n"                    # we send \n; we accept \n or \r\n
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)  # Linux only
+
+
+def set_nodelay(sock: socket.socket) -> None:
+    """
+    Turn off Nagle's algorithm. Every protocol line is a tiny ping-pong
+    message, so waiting to coalesce it only adds latency (up to ~40 ms when
+    it meets the peer's delayed ACK). No-op for non-TCP sockets.
+    """
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except OSError:
+        pass
 
 
 class TcpGame:
@@ -18,14 +34,29 @@ class TcpGame:
     Small, line-oriented TCP wrapper:
       - UTF-8 text protocol
       - send_line(): str -> '\n'-terminated
+      - queue_line(): buffer a line; it goes out with the next send or
+        before the next recv_line() wait, in the same write
+      - send_bytes_line() / recv_line_bytes(): same, for pre-encoded lines
       - recv_line(): returns a single line (without trailing CR/LF)
       - raises ProtocolError on timeout/disconnect/malformed
+
+    The socket is non-blocking; waits go through a selector (epoll/kqueue
+    where available) with the current timeout, so a quiet peer costs one
+    select call rather than a timed socket op per read.
     """
 
     def __init__(self, sock: socket.socket, timeout: float = _DEFAULT_TIMEOUT):
         self._sock = sock
-        self._sock.settimeout(timeout)
+        set_nodelay(self._sock)
+        self._sock.setblocking(False)
+        self._timeout: Optional[float] = timeout
+        self._sel = selectors.DefaultSelector()
+        self._sel.register(self._sock, selectors.EVENT_READ)
         self._rbuf = bytearray()
+        self._rpos = 0  # start of unconsumed data in _rbuf
+        self._scratch = bytearray(_RECV_SIZE)  # recv_into target, reused for every read
+        self._quickack = _TCP_QUICKACK is not None
+        self._wbuf: List[bytes] = []  # encoded lines waiting for the next write
 
     @classmethod
     def from_connected(cls, sock: socket.socket, timeout: float = _DEFAULT_TIMEOUT) -> "TcpGame":
@@ -41,58 +72,160 @@ class TcpGame:
         except OSError:
             return ("<closed>", 0)
 
-    def set_timeout(self, seconds: float) -> None:
-        self._sock.settimeout(seconds)
+    def set_timeout(self, seconds: Optional[float]) -> None:
+        """Per-operation timeout in seconds; None waits forever."""
+        self._timeout = seconds
 
-    def send_line(self, line: str) -> None:
+    def _wait_writable(self) -> None:
+        # Rare: only when the kernel send buffer is full
+        self._sel.modify(self._sock, selectors.EVENT_WRITE)
+        try:
+            ready = self._sel.select(self._timeout)
+        finally:
+            self._sel.modify(self._sock, selectors.EVENT_READ)
+        if not ready:
+            raise socket.timeout("timed out")
+
+    def _sendall(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            try:
+                sent = self._sock.send(view)
+            except BlockingIOError:
+                sent = 0
+            view = view[sent:]
+            if view:
+                self._wait_writable()
+
+    def queue_line(self, line: str) -> None:
         """
-        Send a single logical line (appends '\n').
+        Buffer a single logical line without writing it yet. Queued lines are
+        sent together with the next send_line()/send_lines(), or by flush(),
+        which recv_line() calls before it waits.
         """
         if "\n" in line or "\r" in line:
             # Keep wire format single-line and simple
             raise ProtocolError("send_line cannot contain CR/LF")
-        data = (line + "\n").encode("utf-8", errors="strict")
+        self._wbuf.append((line + "\n").encode("utf-8", errors="strict"))
+
+    def queue_bytes_line(self, data: bytes) -> None:
+        """
+        Like queue_line() for an already-encoded line that ends in b'\\n'
+        (e.g. protocol.PASS_B / protocol.MOVE_BYTES[...]); no copy or encode.
+        """
+        if data[-1:] != _EOL or _EOL in data[:-1] or b"\r" in data:
+            raise ProtocolError("send_bytes_line needs exactly one trailing LF and no CR")
+        self._wbuf.append(data)
+
+    def flush(self) -> None:
+        """
+        Write any queued lines in one send.
+        """
+        if not self._wbuf:
+            return
+        data = b"".join(self._wbuf)
+        self._wbuf.clear()
         try:
-            self._sock.sendall(data)
+            self._sendall(data)
         except (socket.timeout, OSError) as e:
             raise ProtocolError(f"send_line failed: {e}") from e
 
+    def send_line(self, line: str) -> None:
+        """
+        Send a single logical line (appends '\n').
+        """
+        self.queue_line(line)
+        self.flush()
+
+    def send_bytes_line(self, data: bytes) -> None:
+        """
+        Send a single pre-encoded line (must already end in b'\\n').
+        """
+        self.queue_bytes_line(data)
+        self.flush()
+
+    def send_lines(self, lines: Iterable[str]) -> None:
+        """
+        Send several logical lines in a single write.
+        """
+        for line in lines:
+            self.queue_line(line)
+        self.flush()
+
+    def _rearm_quickack(self) -> None:
+        try:
+            self._sock.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+        except OSError:
+            self._quickack = False  # not a TCP socket (e.g. socketpair); stop trying
+
     def recv_line(self) -> str:
         """
         Receive a single logical line, returning it without trailing CR/LF.
         Raises ProtocolError on timeout, disconnect, or overly long line.
         """
+        return self.recv_line_bytes().decode("utf-8", errors="strict")
+
+    def recv_line_bytes(self) -> bytes:
+        """
+        Receive a single logical line as raw bytes, without trailing CR/LF.
+        Raises ProtocolError on timeout, disconnect, or overly long line.
+
+        On Linux each read re-arms TCP_QUICKACK: the kernel clears it again
+        after ACKing, and the game is strict ping-pong, so a delayed ACK
+        only stalls the peer's next send.
+        """
         while True:
             # Do we already have a full line?
-            nl = self._rbuf.find(ord("\n"))
+            buf = self._rbuf
+            start = self._rpos
+            nl = buf.find(_EOL, start)
             if nl != -1:
-                raw = bytes(self._rbuf[:nl + 1])
-                del self._rbuf[:nl + 1]
-                # Strip one trailing LF and optional preceding CR
-                if raw.endswith(b"\r\n"):
-                    raw = raw[:-2]
-                elif raw.endswith(b"\n"):
-                    raw = raw[:-1]
-                return raw.decode("utf-8", errors="strict")
-
-            if len(self._rbuf) >= _MAX_LINE_LEN:
+                # Strip the LF and an optional preceding CR
+                end = nl - 1 if nl > start and buf[nl - 1] == 0x0D else nl
+                raw = buf[start:end]
+                # Advance the cursor; only shift bytes once the consumed prefix is large
+                self._rpos = nl + 1
+                if self._rpos == len(buf):
+                    buf.clear()
+                    self._rpos = 0
+                elif self._rpos >= _COMPACT_AT and self._rpos >= len(buf) // 2:
+                    del buf[:self._rpos]
+                    self._rpos = 0
+                return bytes(raw)
+
+            if len(buf) - start >= _MAX_LINE_LEN:
                 raise ProtocolError("Incoming line exceeds max length")
 
-            # Read more
+            # Read more; anything queued must reach the peer before we wait on it
+            if self._wbuf:
+                self.flush()
             try:
-                chunk = self._sock.recv(4096)
-            except socket.timeout as e:
-                raise ProtocolError("recv_line timeout") from e
+                if not self._sel.select(self._timeout):
+                    raise ProtocolError("recv_line timeout")
+                n = self._sock.recv_into(self._scratch)
+            except BlockingIOError:
+                continue  # spurious wake-up
             except OSError as e:
                 raise ProtocolError(f"recv_line failed: {e}") from e
 
-            if not chunk:
+            if not n:
                 # Peer closed while we were waiting for a newline
                 raise ProtocolError("Connection closed by peer")
+            if self._quickack:
+                self._rearm_quickack()
 
-            self._rbuf.extend(chunk)
+            self._rbuf += memoryview(self._scratch)[:n]
 
     def close(self) -> None:
+        # Best effort: don't silently drop a final queued line (e.g. an outcome token)
+        try:
+            self.flush()
+        except (ProtocolError, ValueError):
+            self._wbuf.clear()
+        try:
+            self._sel.close()
+        except (OSError, ValueError):
+            pass
         try:
             try:
                 self._sock.shutdown(socket.SHUT_RDWR)
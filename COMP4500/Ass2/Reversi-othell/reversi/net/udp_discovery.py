@@ -2,37 +2,158 @@
 #   Zachary Chan c3468750
 from __future__ import annotations
 
+import ipaddress
+import logging
 import random
-import select
+import selectors
 import socket
+import struct
+import sys
 import time
-from typing import Optional, Tuple
+from typing import Iterator, List, Literal, Optional, Tuple
 
 from ..protocol import (
-    encode_new_game,
+    encode_new_game_bytes,
     decode_new_game,
     PORT_MIN,
     PORT_MAX,
 )
 from ..errors import ProtocolError
+from .tcp_game import set_nodelay
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+LOG = logging.getLogger("reversi.discovery")
 
 DEFAULT_WINDOW = 5.0  # seconds per wait window
+UDP_RCVBUF = 1 << 20    # room for an advert burst while we're busy elsewhere
+UDP_SNDBUF = 256 << 10
+
+# Optional multicast discovery: adverts go to an organisation-local group
+# (TTL 1, so they never leave the link) and only hosts that joined it see
+# them. Broadcast stays the default for LANs whose switches drop multicast.
+DiscoveryMode = Literal["broadcast", "multicast"]
+MULTICAST_GROUP = "239.255.45.0"
+
+# Non-blocking recv on the (blocking) advert listener; not on Windows
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+
+# Gameplay port we last listened on; tried first next time (usually still free)
+_last_good_port: Optional[int] = None
+_PORT_SHORTLIST = 8  # random ports tried before scanning the whole range
+
+# Linux interface ioctls (struct ifreq: 16-byte name, then the union)
+_SIOCGIFFLAGS = 0x8913
+_SIOCGIFBRDADDR = 0x8919
+_IFF_UP_BROADCAST = 0x1 | 0x2  # IFF_UP | IFF_BROADCAST
+
+# Keepalive probing on gameplay sockets: a vanished peer is noticed after
+# ~60s (idle 30s + 3 probes 10s apart) instead of the long game timeout
+_KEEPALIVE_OPTS = (("TCP_KEEPIDLE", 30), ("TCP_KEEPINTVL", 10), ("TCP_KEEPCNT", 3))
 
 
 # helper functions
-def _tie_breaker_key(ts: float, ip: str, port: int) -> tuple:
-    """Lower key wins: earliest timestamp, then ip, then port."""
-    return (ts, ip, port)
+def _tie_breaker_key(ip: str, port: int) -> tuple:
+    """
+    Lower key wins: ip (numerically), then port. No timestamps: the two peers
+    can't compare each other's clocks, and both sides must reach the same verdict.
+    """
+    return (ipaddress.ip_address(ip), port)
 
-def _prefer_peer(my_ad_ts: float, my_ip: str, my_port: int,
-                 peer_ts: float, peer_ip: str, peer_port: int) -> bool:
+def _prefer_peer(my_ip: str, my_port: int, peer_ip: str, peer_port: int) -> bool:
     """Return True if peer's advert should win the race."""
-    return _tie_breaker_key(peer_ts, peer_ip, peer_port) < _tie_breaker_key(my_ad_ts, my_ip, my_port)
+    return _tie_breaker_key(peer_ip, peer_port) < _tie_breaker_key(my_ip, my_port)
+
+def _source_ip_for(peer_ip: str) -> Optional[str]:
+    """
+    Local address we'd send to peer_ip from, i.e. the address the peer sees
+    our adverts come from. A UDP connect only does the route lookup.
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect((peer_ip, 9))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+def _is_local_addr(ip: str) -> bool:
+    """True if ip belongs to this host (any interface, incl. loopback)."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.bind((ip, 0))
+            return True
+    except OSError:
+        return False
+
+def _race_winner(adverts: List[Tuple[str, int]], my_port: int) -> Optional[Tuple[str, int]]:
+    """
+    The advert we should yield to, if any. Our own advert loops back (once per
+    interface we sent it on), so adverts for my_port from a local address are
+    dropped. Each remaining peer is judged against the address it sees us by,
+    not a hostname guess, so both sides reach opposite verdicts.
+    """
+    adverts = [a for a in adverts if not (a[1] == my_port and _is_local_addr(a[0]))]
+    if not adverts:
+        return None
+    peer_ip, peer_port = min(adverts, key=lambda a: _tie_breaker_key(*a))
+    my_ip = _source_ip_for(peer_ip)
+    if my_ip is None or not _prefer_peer(my_ip, my_port, peer_ip, peer_port):
+        return None
+    return peer_ip, peer_port
+
+
+def _interface_broadcast_addrs() -> List[str]:
+    """
+    IPv4 broadcast address of every up, broadcast-capable interface.
+    Linux only (ioctls); returns [] elsewhere or if enumeration fails.
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return []
+    addrs: List[str] = []
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            for _, name in socket.if_nameindex():
+                ifreq = struct.pack("256s", name.encode()[:15])
+                try:
+                    flags = fcntl.ioctl(s.fileno(), _SIOCGIFFLAGS, ifreq)
+                    if struct.unpack_from("H", flags, 16)[0] & _IFF_UP_BROADCAST != _IFF_UP_BROADCAST:
+                        continue
+                    res = fcntl.ioctl(s.fileno(), _SIOCGIFBRDADDR, ifreq)
+                except OSError:
+                    continue  # no IPv4 address on this interface
+                addr = socket.inet_ntoa(res[20:24])  # sockaddr_in.sin_addr
+                if addr != "0.0.0.0" and addr not in addrs:
+                    addrs.append(addr)
+    except OSError:
+        return []
+    return addrs
+
+def _broadcast_targets(broadcast_addr: str) -> List[str]:
+    """The requested address first, then every other interface's broadcast address."""
+    return [broadcast_addr] + [a for a in _interface_broadcast_addrs() if a != broadcast_addr]
 
 
 # functions that are for constructing sockets
-def _make_udp_listener(bind_port: int) -> socket.socket:
+def _prime_game_socket(sock: socket.socket) -> None:
+    """NODELAY + keepalive on a gameplay TCP socket (either side of the match)."""
+    set_nodelay(sock)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    except OSError:
+        return
+    for name, value in _KEEPALIVE_OPTS:
+        opt = getattr(socket, name, None)  # Linux/BSD; macOS lacks TCP_KEEPIDLE
+        if opt is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, opt, value)
+            except OSError:
+                pass
+
+def _make_udp_listener(bind_port: int, group: Optional[str] = None) -> socket.socket:
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", None)
@@ -41,38 +162,128 @@ def _make_udp_listener(bind_port: int) -> socket.socket:
             s.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
         except OSError:
             pass
+    _set_udp_rcvbuf(s, UDP_RCVBUF)
     s.bind(("", bind_port))
-    s.setblocking(False)
+    if group is not None:
+        # Still bound to INADDR_ANY, so plain broadcasts are received as well
+        mreq = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton("0.0.0.0"))
+        try:
+            s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+        except OSError:
+            s.close()
+            raise
+    # Left blocking: _recv_new_game waits in recvfrom itself under SO_RCVTIMEO
     return s
 
-def _make_udp_broadcaster() -> socket.socket:
+def _set_udp_rcvbuf(s: socket.socket, size: int) -> None:
+    """
+    Grow the datagram receive queue. UDP has no buffer autotuning, so this
+    only costs memory. SO_RCVBUFFORCE (Linux, CAP_NET_ADMIN) ignores
+    net.core.rmem_max; otherwise the kernel silently caps the request.
+    """
+    for opt in (getattr(socket, "SO_RCVBUFFORCE", None), socket.SO_RCVBUF):
+        if opt is None:
+            continue
+        try:
+            s.setsockopt(socket.SOL_SOCKET, opt, size)
+            break
+        except OSError:
+            continue
+    else:
+        return
+    got = s.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+    if got < size:  # Linux reports double the usable size, so this is a real cap
+        LOG.debug("UDP SO_RCVBUF capped at %d (asked %d); raise net.core.rmem_max", got, size)
+
+def _set_recv_timeout(s: socket.socket, seconds: float) -> None:
+    """Kernel-side receive timeout (SO_RCVTIMEO) on a blocking socket; EAGAIN on expiry."""
+    if sys.platform == "win32":
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, max(1, int(seconds * 1000)))
+        return
+    sec = int(seconds)
+    usec = int((seconds - sec) * 1_000_000)
+    if not sec and not usec:
+        usec = 1  # a zero timeval would mean "block forever"
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_RCVTIMEO, struct.pack("ll", sec, usec))
+
+def _make_udp_broadcaster(multicast: bool = False) -> socket.socket:
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    if multicast:
+        # Link-local only; loopback on so peers on this host hear us too
+        s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+        s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    else:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, UDP_SNDBUF)
+    except OSError:
+        pass
     s.setblocking(False)
     return s
 
-def _choose_free_tcp_port() -> Optional[int]:
-    candidates = list(range(PORT_MIN, PORT_MAX + 1))
-    random.shuffle(candidates)
-    for p in candidates:
-        try:
-            test = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            test.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            test.bind(("", p))
-            test.close()
-            return p
-        except OSError:
-            continue
-    return None
+def _port_candidates() -> Iterator[int]:
+    """
+    Gameplay ports to try, lazily: the last one that worked, a short random
+    sample, and only then (crowded host) the rest of the range in random order.
+    """
+    if _last_good_port is not None:
+        yield _last_good_port
+    ports = range(PORT_MIN, PORT_MAX + 1)
+    shortlist = random.sample(ports, min(_PORT_SHORTLIST, len(ports)))
+    yield from shortlist
+    tried = set(shortlist)
+    rest = [p for p in ports if p not in tried]
+    random.shuffle(rest)
+    yield from rest
+
+def _connect_game(peer_ip: str, peer_port: int, timeout: float) -> Optional[socket.socket]:
+    """
+    Connect back to an advertised game as P2 (one attempt per chosen advert).
+    Return the primed socket, or None if the advert was stale.
+    """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    _prime_game_socket(s)
+    s.settimeout(timeout)
+    try:
+        s.connect((peer_ip, peer_port))
+    except OSError:
+        # A socket whose connect failed can't portably be reused; drop it
+        s.close()
+        return None
+    return s
 
 def _make_tcp_listener(port: int, accept_timeout: float) -> socket.socket:
     s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("", port))
-    s.listen(1)
+    # No SO_REUSEPORT here (unlike the UDP listener): the bind must fail when
+    # another local instance holds the port, or both would advertise it and a
+    # connect could land on the wrong one (even our own). No TCP_DEFER_ACCEPT
+    # either: P2 never speaks first (BLACK/P1 moves first), so accept would stall.
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("", port))
+        s.listen(1)
+    except OSError:
+        s.close()
+        raise
     s.settimeout(accept_timeout)
     return s
 
+def _open_tcp_listener(accept_timeout: float) -> Optional[Tuple[socket.socket, int]]:
+    """
+    Listen on the first gameplay port that binds, trying the last one that
+    worked first. The bind is the probe, so there is no probe/bind race.
+    Return (listener, port), or None if every port is taken.
+    """
+    global _last_good_port
+    for p in _port_candidates():
+        try:
+            s = _make_tcp_listener(p, accept_timeout)
+        except OSError:
+            continue
+        _last_good_port = p
+        return s, p
+    return None
+
 
 # the actual UDP discovery protocol functions
 def _recv_new_game(udp_sock: socket.socket, timeout: float) -> Optional[Tuple[str, int, Tuple[str, int]]]:
@@ -80,29 +291,59 @@ def _recv_new_game(udp_sock: socket.socket, timeout: float) -> Optional[Tuple[st
     Wait up to 'timeout' for a NEW GAME:<port> UDP datagram.
     Return (sender_ip, gameplay_port, sender_addr) if seen; else None.
     """
-    end = time.time() + timeout
-    while time.time() < end:
-        r, _, _ = select.select([udp_sock], [], [], max(0.0, end - time.time()))
-        if not r:
-            continue
+    end = time.monotonic() + timeout
+    remaining = timeout
+    while remaining > 0:
+        # One recvfrom per datagram; the timeout is only re-armed after a rejected one
+        _set_recv_timeout(udp_sock, remaining)
         try:
             data, addr = udp_sock.recvfrom(4096)
-        except BlockingIOError:
-            continue
+        except (BlockingIOError, socket.timeout):
+            return None  # SO_RCVTIMEO expired
+        remaining = end - time.monotonic()
         if not data:
             continue
-        line = data.decode("utf-8", errors="replace").rstrip("\r\n")
         try:
-            gameplay_port = decode_new_game(line)
+            gameplay_port = decode_new_game(data)
         except ProtocolError:
             continue
         sender_ip = addr[0]
         return (sender_ip, gameplay_port, addr)
     return None
 
-def _broadcast_new_game(udp_bcaster: socket.socket, broadcast_addr: str, broadcast_port: int, gameplay_port: int) -> None:
-    payload = encode_new_game(gameplay_port).encode("utf-8")
-    udp_bcaster.sendto(payload, (broadcast_addr, broadcast_port))
+def _drain_adverts(udp_sock: socket.socket) -> List[Tuple[str, int]]:
+    """
+    Read every queued datagram without blocking (call after a readiness wake);
+    return the valid adverts as (sender_ip, gameplay_port). Without
+    MSG_DONTWAIT only the one datagram known to be ready is read.
+    """
+    adverts: List[Tuple[str, int]] = []
+    while True:
+        try:
+            data, addr = udp_sock.recvfrom(4096, _MSG_DONTWAIT)
+        except (BlockingIOError, socket.timeout):
+            break
+        if data:
+            try:
+                adverts.append((addr[0], decode_new_game(data)))
+            except ProtocolError:
+                pass
+        if not _MSG_DONTWAIT:
+            break
+    return adverts
+
+def _broadcast_new_game(udp_bcaster: socket.socket, broadcast_addrs: List[str], broadcast_port: int, gameplay_port: int) -> None:
+    """
+    Send the advert to every address back to back. The first is the one the
+    user asked for, so its errors propagate; the extra interfaces are best effort.
+    """
+    payload = encode_new_game_bytes(gameplay_port)
+    udp_bcaster.sendto(payload, (broadcast_addrs[0], broadcast_port))
+    for addr in broadcast_addrs[1:]:
+        try:
+            udp_bcaster.sendto(payload, (addr, broadcast_port))
+        except OSError:
+            pass
 
 
 # main matchmaking function
@@ -110,6 +351,8 @@ def discover_and_connect(
     broadcast_addr: str,
     broadcast_port: int,
     window: float = DEFAULT_WINDOW,
+    *,
+    discovery_mode: DiscoveryMode = "broadcast",
 ) -> Tuple[str, socket.socket, Tuple[str, int], int]:
     """
     Robust matchmaking:
@@ -120,10 +363,22 @@ def discover_and_connect(
          b) A competing NEW GAME advert that wins the tie-breaker (→ switch to P2 and connect),
          all within 'window'. On failure, loop.
 
+    With discovery_mode="multicast" adverts go to MULTICAST_GROUP on
+    broadcast_port instead of broadcast_addr (broadcast adverts are still heard).
+
     Returns: (role, connected_tcp_sock, peer_sockaddr, gameplay_port)
     """
-    udp_listener = _make_udp_listener(broadcast_port)
-    udp_bcaster = _make_udp_broadcaster()
+    if discovery_mode == "multicast":
+        udp_listener = _make_udp_listener(broadcast_port, group=MULTICAST_GROUP)
+        udp_bcaster = _make_udp_broadcaster(multicast=True)
+        broadcast_addrs = [MULTICAST_GROUP]
+    elif discovery_mode == "broadcast":
+        udp_listener = _make_udp_listener(broadcast_port)
+        udp_bcaster = _make_udp_broadcaster()
+        # Advertise on every interface, not just the one routing broadcast_addr
+        broadcast_addrs = _broadcast_targets(broadcast_addr)
+    else:
+        raise ValueError(f"unknown discovery_mode: {discovery_mode!r}")
 
     try:
         attempt = 0
@@ -134,45 +389,37 @@ def discover_and_connect(
             found = _recv_new_game(udp_listener, timeout=window)
             if found:
                 sender_ip, gameplay_port, _ = found
-                tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                tcp_sock.settimeout(window)
-                try:
-                    tcp_sock.connect((sender_ip, gameplay_port))
-                except OSError:
-                    tcp_sock.close()
+                tcp_sock = _connect_game(sender_ip, gameplay_port, timeout=window)
+                if tcp_sock is None:
                     continue  # stale advert, try again
-                tcp_sock.settimeout(window)
                 return "P2", tcp_sock, (sender_ip, gameplay_port), gameplay_port
 
             # STEP 2: active advertise + race-friendly wait
-            # choose a port (fallback if bind fails)
-            while True:
-                gameplay_port = _choose_free_tcp_port()
-                if gameplay_port is None:
-                    time.sleep(0.2)
-                    continue
-                try:
-                    listener = _make_tcp_listener(gameplay_port, accept_timeout=window)
-                    break
-                except OSError:
-                    # race between probe and bind; retry
-                    time.sleep(0.05)
-                    continue
-
-            my_advert_ts = time.time()
-            my_ip_guess = socket.gethostbyname(socket.gethostname()) or "255.255.255.255"
+            # listen on a free port (wait if every port is taken)
+            bound = _open_tcp_listener(accept_timeout=window)
+            while bound is None:
+                time.sleep(0.2)
+                bound = _open_tcp_listener(accept_timeout=window)
+            listener, gameplay_port = bound
 
+            # Wait on both: listener for TCP accept, UDP for competing adverts.
+            # Registered once per window (epoll/kqueue where available).
+            sel = selectors.DefaultSelector()
             try:
-                _broadcast_new_game(udp_bcaster, broadcast_addr, broadcast_port, gameplay_port)
-
-                end = time.time() + window
-                while time.time() < end:
-                    # Wait on both: listener for TCP accept, UDP for competing adverts
-                    timeout = max(0.0, end - time.time())
-                    rlist = [listener, udp_listener]
-                    r, _, _ = select.select(rlist, [], [], timeout)
+                sel.register(listener, selectors.EVENT_READ)
+                sel.register(udp_listener, selectors.EVENT_READ)
+                _broadcast_new_game(udp_bcaster, broadcast_addrs, broadcast_port, gameplay_port)
+
+                # One clock read per wake; locals skip the attribute lookups
+                monotonic, select = time.monotonic, sel.select
+                end = monotonic() + window
+                while True:
+                    remaining = end - monotonic()
+                    if remaining <= 0:
+                        break
+                    r = [key.fileobj for key, _ in select(remaining)]
                     if not r:
-                        continue
+                        break  # select already waited out the window
 
                     # Incoming TCP?
                     if listener in r:
@@ -181,40 +428,25 @@ def discover_and_connect(
                         except socket.timeout:
                             pass
                         else:
+                            _prime_game_socket(conn)
                             conn.settimeout(window)
                             return "P1", conn, addr, gameplay_port
 
-                    # Competing NEW GAME?
+                    # Competing NEW GAME? Take the whole burst, judge only the best advert
                     if udp_listener in r:
-                        try:
-                            data, addr = udp_listener.recvfrom(4096)
-                        except BlockingIOError:
-                            data = None
-                        if data:
-                            line = data.decode("utf-8", errors="replace").rstrip("\r\n")
+                        winner = _race_winner(_drain_adverts(udp_listener), gameplay_port)
+                        if winner is not None:
+                            # Demote myself; connect back as P2
+                            peer_ip, peer_port = winner
+                            tcp_sock = _connect_game(peer_ip, peer_port, timeout=window)
+                            if tcp_sock is None:
+                                # Could not connect; keep our own advert up for the rest of the window
+                                continue
                             try:
-                                peer_port = decode_new_game(line)
-                            except ProtocolError:
-                                peer_port = None
-                            if peer_port is not None:
-                                peer_ip = addr[0]
-                                peer_ts = time.time()  # arrival time stands in for advert time
-                                if _prefer_peer(my_advert_ts, my_ip_guess, gameplay_port, peer_ts, peer_ip, peer_port):
-                                    # Demote myself; connect back as P2
-                                    try:
-                                        listener.close()
-                                    except Exception:
-                                        pass
-                                    tcp_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                                    tcp_sock.settimeout(window)
-                                    try:
-                                        tcp_sock.connect((peer_ip, peer_port))
-                                    except OSError:
-                                        tcp_sock.close()
-                                        # Could not connect; keep waiting within the window
-                                        continue
-                                    tcp_sock.settimeout(window)
-                                    return "P2", tcp_sock, (peer_ip, peer_port), peer_port
+                                listener.close()
+                            except Exception:
+                                pass
+                            return "P2", tcp_sock, (peer_ip, peer_port), peer_port
 
                 # Window expired: no accept and did not switch; retry loop
                 try:
@@ -224,6 +456,7 @@ def discover_and_connect(
 
             finally:
                 # ensure listener closed on any exception path above
+                sel.close()
                 try:
                     listener.close()
                 except Exception:
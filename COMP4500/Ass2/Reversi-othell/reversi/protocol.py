@@ -3,9 +3,7 @@
 
 from __future__ import annotations
 
-import re
-from dataclasses import dataclass
-from typing import Literal, Tuple
+from typing import Literal, NamedTuple, Tuple
 
 from .errors import ProtocolError
 
@@ -18,6 +16,9 @@ YOU_LOSE = "YOU LOSE"   # TCP line
 DRAW     = "DRAW"       # TCP line
 ERROR    = "ERROR"      # TCP line
 
+MOVE_PREFIX   = f"{MOVE}:"   # every MOVE line starts with this
+MOVE_PREFIX_B = MOVE_PREFIX.encode("ascii")
+
 # Gameplay port constraints
 PORT_MIN = 9000
 PORT_MAX = 9100
@@ -28,39 +29,68 @@ ROW_MAX = 7
 COL_MIN = 0
 COL_MAX = 7
 
-# Precompiled patterns (strict)
-_RE_NEW_GAME = re.compile(rf"^{re.escape(NEW_GAME)}:(\d+)$")
-_RE_MOVE     = re.compile(rf"^{MOVE}:(-?\d+),(-?\d+)$")
-
-
-# ---- Dataclasses for typed decode results ----
-@dataclass(frozen=True)
-class MsgMove:
+# Pre-encoded wire lines ('\n'-terminated ASCII) for the fixed token alphabet,
+# so hot send paths skip str concatenation + UTF-8 encode (TcpGame.send_bytes_line)
+PASS_B     = b"PASS\n"
+YOU_WIN_B  = b"YOU WIN\n"
+YOU_LOSE_B = b"YOU LOSE\n"
+DRAW_B     = b"DRAW\n"
+ERROR_B    = b"ERROR\n"
+TOKEN_BYTES = {PASS: PASS_B, YOU_WIN: YOU_WIN_B, YOU_LOSE: YOU_LOSE_B, DRAW: DRAW_B, ERROR: ERROR_B}
+MOVE_BYTES = {
+    (r, c): MOVE_PREFIX_B + f"{r},{c}\n".encode("ascii")
+    for r in range(ROW_MIN, ROW_MAX + 1)
+    for c in range(COL_MIN, COL_MAX + 1)
+}
+
+# Token line -> canonical token (MsgToken.kind)
+_TOKEN_KINDS = {t: t for t in (PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR)}
+# Same, keyed by the raw wire bytes so received lines are classified undecoded
+_TOKEN_BYTES_TO_KIND = {t.encode("ascii"): t for t in _TOKEN_KINDS}
+
+# NEW GAME is parsed by hand (prefix + ASCII digits); str and raw-datagram forms
+_NG_PREFIX   = f"{NEW_GAME}:"
+_NG_PREFIX_B = _NG_PREFIX.encode("ascii")
+
+
+# ---- Typed decode results (NamedTuples: immutable, C-level construction) ----
+class MsgMove(NamedTuple):
     row: int
     col: int
 
-@dataclass(frozen=True)
-class MsgToken:
+class MsgToken(NamedTuple):
     # One of: PASS / YOU WIN / YOU LOSE / DRAW / ERROR
     kind: Literal["PASS", "YOU WIN", "YOU LOSE", "DRAW", "ERROR"]
 
+# Immutable, so one shared instance per token; decoding a token allocates nothing
+_TOKEN_MSGS = {t: MsgToken(t) for t in _TOKEN_KINDS}
+
 
 # UDP: NEW GAME helpers
 def encode_new_game(port: int) -> str:
     """Return UDP broadcast payload 'NEW GAME:<port>'."""
+    return encode_new_game_bytes(port).decode("ascii")
+
+def encode_new_game_bytes(port: int) -> bytes:
+    """Return the UDP datagram b'NEW GAME:<port>', ready for sendto."""
     _validate_port(port)
-    return f"{NEW_GAME}:{port}"
+    return _NG_PREFIX_B + b"%d" % port
 
-def decode_new_game(line: str) -> int:
+def decode_new_game(line: str | bytes) -> int:
     """
-    Parse 'NEW GAME:<port>' and return port.
+    Parse 'NEW GAME:<port>' and return port. Also accepts the raw UDP
+    datagram as bytes, so the receive path needn't decode it first.
     Raise ProtocolError for malformed or out-of-range.
     """
-    s = _strip_line(line)
-    m = _RE_NEW_GAME.match(s)
-    if not m:
+    if isinstance(line, (bytes, bytearray)):
+        s, prefix = line.rstrip(b"\r\n"), _NG_PREFIX_B
+    else:
+        s, prefix = _strip_line(line), _NG_PREFIX
+    digits = s[len(prefix):]
+    # isascii() first: str.isdigit() also accepts non-ASCII digits
+    if not (s.startswith(prefix) and digits.isascii() and digits.isdigit()):
         raise ProtocolError(f"Malformed NEW GAME: {line!r}")
-    port = int(m.group(1))
+    port = int(digits)
     _validate_port(port)
     return port
 
@@ -69,17 +99,25 @@ def decode_new_game(line: str) -> int:
 def encode_move(row: int, col: int) -> str:
     """Return 'MOVE:r,c' with 0-based coords."""
     _validate_coord(row, col)
-    return f"{MOVE}:{row},{col}"
+    return f"{MOVE_PREFIX}{row},{col}"
+
+def encode_move_bytes(row: int, col: int) -> bytes:
+    """Return the wire line b'MOVE:r,c\\n' for 0-based coords (table lookup)."""
+    try:
+        return MOVE_BYTES[(row, col)]
+    except (KeyError, TypeError):
+        raise ProtocolError(f"Row/col out of bounds (0..7): {(row, col)}") from None
 
 def decode_move(line: str) -> MsgMove:
     """
     Parse 'MOVE:r,c' (0-based). Raise ProtocolError if malformed or out of bounds.
     """
     s = _strip_line(line)
-    m = _RE_MOVE.match(s)
-    if not m:
+    head, sep, rest = s.partition(":")
+    r_s, sep2, c_s = rest.partition(",")
+    if head != MOVE or not sep or not sep2 or not (_is_int(r_s) and _is_int(c_s)):
         raise ProtocolError(f"Malformed MOVE: {line!r}")
-    r, c = int(m.group(1)), int(m.group(2))
+    r, c = int(r_s), int(c_s)
     _validate_coord(r, c)
     return MsgMove(r, c)
 
@@ -89,10 +127,21 @@ def is_token(line: str) -> bool:
 
 def decode_token(line: str) -> MsgToken:
     """Decode PASS / YOU WIN / YOU LOSE / DRAW / ERROR → MsgToken."""
-    kind = _token_kind_or_none(line)
+    msg = _TOKEN_MSGS.get(_strip_line(line))
+    if msg is None:
+        raise ProtocolError(f"Not a valid token: {line!r}")
+    return msg
+
+def is_token_bytes(line: bytes) -> bool:
+    """is_token for a raw received line (no UTF-8 decode)."""
+    return line.rstrip(b"\r\n") in _TOKEN_BYTES_TO_KIND
+
+def decode_token_bytes(line: bytes) -> MsgToken:
+    """decode_token for a raw received line (no UTF-8 decode)."""
+    kind = _TOKEN_BYTES_TO_KIND.get(line.rstrip(b"\r\n"))
     if kind is None:
         raise ProtocolError(f"Not a valid token: {line!r}")
-    return MsgToken(kind)
+    return _TOKEN_MSGS[kind]
 
 
 # General parsing helpers
@@ -103,11 +152,11 @@ def parse_tcp_line(line: str) -> MsgMove | MsgToken:
     - PASS/DRAW/YOU WIN/YOU LOSE/ERROR -> MsgToken
     """
     s = _strip_line(line)
-    if s.startswith(f"{MOVE}:"):
+    if s.startswith(MOVE_PREFIX):
         return decode_move(s)
-    tk = _token_kind_or_none(s)
-    if tk is not None:
-        return MsgToken(tk)
+    msg = _TOKEN_MSGS.get(s)
+    if msg is not None:
+        return msg
     raise ProtocolError(f"Unknown/invalid TCP message: {line!r}")
 
 
@@ -117,18 +166,20 @@ def _validate_port(port: int) -> None:
         raise ProtocolError(f"Gameplay port must be in [{PORT_MIN}..{PORT_MAX}], got {port}")
 
 def _validate_coord(row: int, col: int) -> None:
-    if not (ROW_MIN <= row <= ROW_MAX and COL_MIN <= col <= COL_MAX):
+    # With *_MIN == 0 and *_MAX == 2**k - 1, a value is in range iff it has no
+    # bits outside *_MAX (negatives always do)
+    if (row & ~ROW_MAX) | (col & ~COL_MAX):
         raise ProtocolError(f"Row/col out of bounds (0..7): {(row, col)}")
 
+def _is_int(s: str) -> bool:
+    # Optional '-' then ASCII digits only; int() alone would also take '+', spaces, '_'
+    digits = s[1:] if s[:1] == "-" else s
+    return digits.isascii() and digits.isdigit()
+
 def _strip_line(line: str) -> str:
     # Strip trailing CR/LF and surrounding whitespace, but do NOT allow embedded spaces for tokens.
     return line.rstrip("\r\n")
 
-def _token_kind_or_none(line: str) -> MsgToken["kind"] | None:
-    s = _strip_line(line)
-    if   s == PASS:    return PASS
-    elif s == DRAW:    return DRAW
-    elif s == YOU_WIN: return YOU_WIN
-    elif s == YOU_LOSE:return YOU_LOSE
-    elif s == ERROR:   return ERROR
-    return None
+def _token_kind_or_none(line: str) -> str | None:
+    # One hash lookup; returns the canonical (module-level) token string
+    return _TOKEN_KINDS.get(_strip_line(line))
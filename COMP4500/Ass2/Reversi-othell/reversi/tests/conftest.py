@@ -0,0 +1,21 @@
+import random
+import pytest
+
+
+def _random_positions(n, seed):
+    """(player, opponent) bitboard pairs; about half thinned out so sparse boards are covered too."""
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        p = rng.getrandbits(64)
+        o = rng.getrandbits(64) & ~p
+        if rng.random() < 0.5:
+            p &= rng.getrandbits(64)
+            o &= rng.getrandbits(64)
+        out.append((p, o))
+    return out
+
+
+@pytest.fixture
+def random_positions():
+    return _random_positions
@@ -10,6 +10,13 @@ def test_try_parse_algebraic_valid_and_invalid():
     assert try_parse_algebraic("Z9") is None
     assert try_parse_algebraic("33") is None
     assert try_parse_algebraic("") is None
+    assert try_parse_algebraic(" d03 ") == (2, 3)
+    assert try_parse_algebraic("I1") is None
+    assert try_parse_algebraic("@1") is None
+    assert try_parse_algebraic("A0") is None
+    assert try_parse_algebraic("A9") is None
+    assert try_parse_algebraic("A10") is None
+    assert try_parse_algebraic("A1x") is None
 
 def test_format_moves_has_human_labels():
     moves = [(2, 3), (2, 4)]
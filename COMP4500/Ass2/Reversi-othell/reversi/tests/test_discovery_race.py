@@ -1,15 +1,107 @@
-from reversi.net.udp_discovery import _prefer_peer, _tie_breaker_key
-
-def test_tie_breaker_prefers_earlier_time():
-    me = (10.0, "192.168.1.50", 9050)
-    peer = (9.9, "192.168.1.99", 9050)
-    assert _prefer_peer(*me, *peer) is True
-
-def test_tie_breaker_uses_ip_then_port_on_equal_time():
-    t = 10.0
-    # same time, lower IP should win
-    assert _prefer_peer(t, "192.168.1.50", 9050, t, "192.168.1.49", 9099) is True
-    # same time+ip, lower port should win
-    assert _prefer_peer(t, "192.168.1.50", 9050, t, "192.168.1.50", 9049) is True
+import pytest
+
+from reversi.net.udp_discovery import _prefer_peer, _race_winner, _source_ip_for, _tie_breaker_key
+
+def test_tie_breaker_uses_ip_then_port():
+    # lower IP should win
+    assert _prefer_peer("192.168.1.50", 9050, "192.168.1.49", 9099) is True
+    # same ip, lower port should win
+    assert _prefer_peer("192.168.1.50", 9050, "192.168.1.50", 9049) is True
     # peer with higher ip/port loses
-    assert _prefer_peer(t, "192.168.1.50", 9050, t, "192.168.1.60", 9040) is False
+    assert _prefer_peer("192.168.1.50", 9050, "192.168.1.60", 9040) is False
+
+def test_tie_breaker_is_symmetric_and_ignores_own_advert():
+    a, b = ("192.168.1.50", 9050), ("192.168.1.99", 9010)
+    # exactly one side yields
+    assert _prefer_peer(*a, *b) != _prefer_peer(*b, *a)
+    # hearing my own advert never demotes me
+    assert _prefer_peer(*a, *a) is False
+    assert _tie_breaker_key(*a) < _tie_breaker_key(*b)
+
+def test_tie_breaker_compares_ips_numerically():
+    # As strings "10.…" < "9.…"; numerically 9.x is lower
+    assert _prefer_peer("10.0.0.5", 9050, "9.0.0.1", 9099) is True
+    assert _prefer_peer("9.0.0.1", 9099, "10.0.0.5", 9050) is False
+
+def test_race_ignores_own_looped_back_advert():
+    # Our advert comes back from our own address(es) with our port; whatever the
+    # hostname resolves to, that must never demote us
+    assert _race_winner([("127.0.0.1", 9074)], 9074) is None
+    # same host, different port: a real second instance, judged by port
+    assert _race_winner([("127.0.0.1", 9010)], 9074) == ("127.0.0.1", 9010)
+    assert _race_winner([("127.0.0.1", 9090)], 9074) is None
+
+def test_race_judges_peer_against_our_visible_address():
+    peer = "192.0.2.77"  # TEST-NET-1, never local
+    mine = _source_ip_for(peer)
+    if mine is None:
+        pytest.skip("no route off this host")
+    # Own loopback copy + the peer: only the peer is judged, by the address it sees
+    verdict = _race_winner([(mine, 9074), (peer, 9050)], 9074)
+    assert (verdict == (peer, 9050)) == _prefer_peer(mine, 9074, peer, 9050)
+
+def test_drain_adverts_reads_whole_burst():
+    import socket, time
+    from reversi.net.udp_discovery import _drain_adverts, _MSG_DONTWAIT
+    if not _MSG_DONTWAIT:
+        pytest.skip("MSG_DONTWAIT not available on this platform")
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        rx.bind(("127.0.0.1", 0))
+        for msg in (b"NEW GAME:9020", b"junk", b"NEW GAME:9010"):
+            tx.sendto(msg, rx.getsockname())
+        time.sleep(0.05)
+        assert [p for _, p in _drain_adverts(rx)] == [9020, 9010]
+        assert _drain_adverts(rx) == []  # queue empty, did not block
+    finally:
+        rx.close()
+        tx.close()
+
+def test_recv_new_game_parses_raw_datagrams():
+    import socket
+    from reversi.net.udp_discovery import _recv_new_game
+    rx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    tx = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        rx.bind(("127.0.0.1", 0))
+        # Not UTF-8, then CRLF-terminated: neither needs a str round-trip
+        tx.sendto(b"NEW GAME:\xff\xfe", rx.getsockname())
+        tx.sendto(b"NEW GAME:9042\r\n", rx.getsockname())
+        ip, port, _ = _recv_new_game(rx, timeout=1.0)
+        assert (ip, port) == ("127.0.0.1", 9042)
+        assert _recv_new_game(rx, timeout=0.05) is None
+    finally:
+        rx.close()
+        tx.close()
+
+def test_multicast_advert_reaches_group_member():
+    from reversi.net.udp_discovery import (
+        MULTICAST_GROUP, _broadcast_new_game, _make_udp_broadcaster, _make_udp_listener, _recv_new_game,
+    )
+    try:
+        rx = _make_udp_listener(9097, group=MULTICAST_GROUP)
+    except OSError:
+        pytest.skip("no multicast route on this host")
+    tx = _make_udp_broadcaster(multicast=True)
+    try:
+        try:
+            _broadcast_new_game(tx, [MULTICAST_GROUP], 9097, 9042)
+        except OSError:
+            pytest.skip("multicast send not permitted on this host")
+        found = _recv_new_game(rx, timeout=1.0)
+        assert found is not None and found[1] == 9042
+    finally:
+        rx.close()
+        tx.close()
+
+def test_unknown_discovery_mode_rejected():
+    from reversi.net.udp_discovery import discover_and_connect
+    with pytest.raises(ValueError):
+        discover_and_connect("255.255.255.255", 9097, window=0.1, discovery_mode="anycast")
+
+def test_race_ignores_own_advert_from_every_interface():
+    # Advertising on each interface's broadcast address loops our advert back
+    # once per interface, each copy with a different source IP
+    local = {"127.0.0.1"} | {ip for ip in (_source_ip_for("192.0.2.77"),) if ip}
+    assert _race_winner([(ip, 9074) for ip in sorted(local)], 9074) is None
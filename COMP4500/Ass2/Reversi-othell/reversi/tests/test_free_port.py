@@ -1,6 +1,39 @@
-from reversi.net.udp_discovery import _choose_free_tcp_port
+import pytest
+
+from reversi.net.udp_discovery import _make_tcp_listener, _open_tcp_listener, _port_candidates
 from reversi.protocol import PORT_MIN, PORT_MAX
 
-def test_choose_free_tcp_port_in_range():
-    p = _choose_free_tcp_port()
-    assert p is None or (PORT_MIN <= p <= PORT_MAX)
+def test_open_tcp_listener_binds_in_range():
+    assert all(PORT_MIN <= p <= PORT_MAX for p in _port_candidates())
+    bound = _open_tcp_listener(accept_timeout=0.1)
+    assert bound is not None
+    s, p = bound
+    try:
+        assert PORT_MIN <= p <= PORT_MAX
+        assert s.getsockname()[1] == p  # the port handed back is the one actually held
+    finally:
+        s.close()
+
+def test_open_tcp_listener_reuses_last_port():
+    first = _open_tcp_listener(accept_timeout=0.1)
+    assert first is not None
+    s, p = first
+    assert PORT_MIN <= p <= PORT_MAX
+    s.close()
+    second = _open_tcp_listener(accept_timeout=0.1)
+    assert second is not None
+    second[0].close()
+    assert second[1] == p
+
+def test_port_candidates_cover_range_once():
+    ports = list(_port_candidates())
+    tail = ports[1:] if len(ports) > PORT_MAX - PORT_MIN + 1 else ports  # optional last-good port first
+    assert sorted(tail) == list(range(PORT_MIN, PORT_MAX + 1))
+
+def test_gameplay_listener_port_is_exclusive():
+    s, p = _open_tcp_listener(accept_timeout=0.1)
+    try:
+        with pytest.raises(OSError):
+            _make_tcp_listener(p, accept_timeout=0.1).close()
+    finally:
+        s.close()
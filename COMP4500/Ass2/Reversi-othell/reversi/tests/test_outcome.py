@@ -1,5 +1,5 @@
 from reversi.game.board import Board, BLACK, WHITE
-from reversi.game.outcome import outcome_token_for, verify_peer_outcome
+from reversi.game.outcome import outcome_token_for, verify_peer_outcome, outcome_compare
 from reversi.protocol import YOU_WIN, YOU_LOSE, DRAW
 
 def _full_board(b_count: int, w_count: int) -> Board:
@@ -36,3 +36,11 @@ def test_verify_peer_outcome_consistency_and_mismatch():
     # If I am BLACK and receive "YOU WIN", I am winning → consistent
     assert verify_peer_outcome(b, BLACK, YOU_WIN) is True
     assert verify_peer_outcome(b, BLACK, YOU_LOSE) is False
+
+def test_outcome_compare_matches_verify_and_token():
+    for b in (_full_board(40, 24), _full_board(32, 32), _full_board(20, 44)):
+        for me in (BLACK, WHITE):
+            for tok in (YOU_WIN, YOU_LOSE, DRAW):
+                ok, mine = outcome_compare(b, me, tok)
+                assert ok == verify_peer_outcome(b, me, tok)
+                assert mine == outcome_token_for(b, me)
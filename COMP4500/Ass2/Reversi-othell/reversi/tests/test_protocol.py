@@ -1,9 +1,10 @@
 import pytest
 
 from reversi.protocol import (
-    encode_new_game, decode_new_game,
-    encode_move, decode_move, parse_tcp_line, decode_token,
-    PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR, MOVE,
+    encode_new_game, encode_new_game_bytes, decode_new_game,
+    encode_move, encode_move_bytes, decode_move, parse_tcp_line, decode_token,
+    is_token_bytes, decode_token_bytes,
+    PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR, MOVE, TOKEN_BYTES,
     PORT_MIN, PORT_MAX,
 )
 from reversi.errors import ProtocolError
@@ -15,6 +16,7 @@ def test_new_game_roundtrip_ok():
         s = encode_new_game(p)
         assert s == f"NEW GAME:{p}"
         assert decode_new_game(s) == p
+        assert encode_new_game_bytes(p) == s.encode()
 
 def test_new_game_malformed_and_range():
     with pytest.raises(ProtocolError):
@@ -25,6 +27,15 @@ def test_new_game_malformed_and_range():
         decode_new_game(f"NEW GAME:{PORT_MIN-1}")
     with pytest.raises(ProtocolError):
         decode_new_game(f"NEW GAME:{PORT_MAX+1}")
+    for bad in ("NEW GAME:", "NEW GAME:+9050", "NEW GAME: 9050", "NEW GAME:9050x", "NEW GAME:\u0669\u0660\u0665\u0660"):
+        with pytest.raises(ProtocolError):
+            decode_new_game(bad)
+
+def test_new_game_accepts_raw_datagram():
+    assert decode_new_game(b"NEW GAME:9050") == 9050
+    assert decode_new_game(b"NEW GAME:9050\r\n") == 9050
+    with pytest.raises(ProtocolError):
+        decode_new_game(b"NEW GAME:9\xff")
 
 
 # ---------- MOVE (TCP) ----------
@@ -35,6 +46,15 @@ def test_move_roundtrip_ok():
         m = decode_move(s)
         assert (m.row, m.col) == (r, c)
 
+def test_pre_encoded_lines_match_str_encoders():
+    for r in range(8):
+        for c in range(8):
+            assert encode_move_bytes(r, c) == (encode_move(r, c) + "\n").encode()
+    for tok, b in TOKEN_BYTES.items():
+        assert b == (tok + "\n").encode()
+    with pytest.raises(ProtocolError):
+        encode_move_bytes(8, 0)
+
 def test_move_invalid_format_or_bounds():
     with pytest.raises(ProtocolError):
         decode_move("MOVE:")
@@ -46,6 +66,14 @@ def test_move_invalid_format_or_bounds():
         decode_move("MOVE:-1,0")
     with pytest.raises(ProtocolError):
         decode_move("MOVE:0,8")
+    # Bit-test bounds: large, negative and mixed out-of-range pairs
+    for r, c in ((8, 8), (-8, 0), (3, -1), (16, 0), (0, 1 << 40)):
+        with pytest.raises(ProtocolError):
+            encode_move(r, c)
+    # int() would accept these; the wire format doesn't
+    for bad in ("MOVE:+1,2", "MOVE: 1,2", "MOVE:1_0,2", "MOVE:1,2,3", "MOVE:-,1", "move:1,2"):
+        with pytest.raises(ProtocolError):
+            decode_move(bad)
 
 
 # ---------- TOKENS (TCP) ----------
@@ -60,6 +88,15 @@ def test_tokens_bad():
     with pytest.raises(ProtocolError):
         decode_token("PASS ")  # trailing space not equal
 
+@pytest.mark.parametrize("tok", [PASS, DRAW, YOU_WIN, YOU_LOSE, ERROR])
+def test_tokens_decode_bytes(tok):
+    raw = tok.encode("ascii")
+    assert is_token_bytes(raw) and is_token_bytes(raw + b"\r\n")
+    assert decode_token_bytes(raw) is decode_token(tok)
+    assert not is_token_bytes(raw + b" ")
+    with pytest.raises(ProtocolError):
+        decode_token_bytes(b"MOVE:1,2")
+
 
 # ---------- Generic parse ----------
 def test_parse_tcp_line():
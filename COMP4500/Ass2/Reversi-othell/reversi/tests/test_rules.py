@@ -1,7 +1,7 @@
 import pytest
 
-from reversi.game.board import Board, BLACK, WHITE, EMPTY
-from reversi.game.rules import valid_moves, apply_move, has_any_move, is_game_over, score
+from reversi.game.board import Board, BLACK, WHITE, EMPTY, zobrist_hash
+from reversi.game.rules import valid_moves, apply_move, has_any_move, is_game_over, score, calc_flip, valid_moves_bb, rotate_180
 from reversi.errors import IllegalMoveError
 
 
@@ -71,3 +71,73 @@ def test_score_counts_match_manual():
     # After BLACK move (2,3), counts should be 4 black vs 1 white
     b2 = apply_move(b, BLACK, 2, 3)
     assert score(b2) == (4, 1)
+
+
+def test_board_bitboards_match_grid():
+    b = Board.initial()
+    # Bit index is r*8 + c: D4/E5 white, E4/D5 black
+    assert b.black == (1 << 28) | (1 << 35)
+    assert b.white == (1 << 27) | (1 << 36)
+    # from_rows/to_rows round-trips through the bitboards
+    assert Board.from_rows(b.to_rows()) == b
+    assert b.counts() == (2, 2, 60)
+    assert b.count(EMPTY) == 60
+    assert b.count("X") == 0  # not a cell value, so never counted
+
+
+def test_calc_flip_bitboard():
+    b = Board.initial()
+    # BLACK at (2,3) flips only the WHITE stone at (3,3) = bit 27
+    assert calc_flip(b.black, b.white, 2 * 8 + 3) == 1 << 27
+    # Corner is not bracketed in any direction
+    assert calc_flip(b.black, b.white, 0) == 0
+    # Long diagonal: BLACK at A1 flips B2..G7 when H8 is BLACK
+    diag = sum(1 << (9 * k) for k in range(1, 7))
+    assert calc_flip(1 << 63, diag, 0) == diag
+
+
+def test_valid_moves_bb_matches_list():
+    b = Board.initial()
+    # D3, C4, F5, E6 for BLACK
+    expected = (1 << 19) | (1 << 26) | (1 << 37) | (1 << 44)
+    assert valid_moves_bb(b, BLACK) == expected
+    assert valid_moves(b, BLACK) == [(2, 3), (3, 2), (4, 5), (5, 4)]
+
+
+def test_zobrist_hash_identifies_position():
+    b = Board.initial()
+    b2 = apply_move(b, BLACK, 2, 3)
+    assert b2.zobrist == zobrist_hash(b2.black, b2.white)
+    assert hash(b) != hash(b2)
+    # Equal positions hash equal, however they were built
+    assert {b, Board.from_rows(b.to_rows())} == {b}
+
+
+def test_rotate_180_maps_square_to_sq_xor_63():
+    for sq in (0, 7, 27, 36, 63):
+        assert rotate_180(1 << sq) == 1 << (sq ^ 63)
+    b = Board.initial()
+    # Starting position is symmetric under a half-turn
+    assert rotate_180(b.black) == b.black
+    assert rotate_180(rotate_180(0x0123456789ABCDEF)) == 0x0123456789ABCDEF
+
+
+def test_is_game_over_side_to_move_agrees():
+    b = Board.initial()
+    assert not is_game_over(b, BLACK) and not is_game_over(b, WHITE)
+    full = Board.from_rows([[BLACK] * 8 for _ in range(8)])
+    assert is_game_over(full) and is_game_over(full, WHITE)
+
+
+def test_move_generation_shared_across_checks(monkeypatch):
+    import reversi.game.rules as rules
+    calls = []
+    real = rules.legal_moves_bb
+    monkeypatch.setattr(rules, "legal_moves_bb", lambda p, o: calls.append(1) or real(p, o))
+    b = Board.initial()
+    # One loop iteration: game-over check, move list, opponent check
+    is_game_over(b, BLACK)
+    valid_moves(b, BLACK)
+    has_any_move(b, WHITE)
+    is_game_over(b, WHITE)
+    assert len(calls) == 2  # once per colour
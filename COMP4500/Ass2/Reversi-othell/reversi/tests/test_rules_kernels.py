@@ -0,0 +1,52 @@
+import importlib
+import pytest
+
+from reversi.game import rules
+from reversi.game.board import Board
+
+# Optional compiled / vectorised kernels, each checked against the pure-Python reference
+SCALAR_KERNELS = [
+    pytest.param("reversi.game.rules_nb", id="numba"),
+    pytest.param("reversi.game.rules_c", id="cython"),
+]
+BATCH_KERNELS = [
+    pytest.param("reversi.game.rules_nb", "batch_legal_moves", id="numba"),
+    pytest.param("reversi.game.rules_np", "legal_moves_bulk", id="numpy"),
+]
+
+
+def _kernel_module(name):
+    try:
+        return importlib.import_module(name)
+    except ImportError as e:
+        pytest.skip(f"{name} unavailable: {e}")
+
+
+@pytest.mark.parametrize("modname", SCALAR_KERNELS)
+def test_scalar_kernels_match_python_reference(modname, random_positions):
+    mod = _kernel_module(modname)
+    for p, o in random_positions(500, seed=7):
+        assert mod.legal_moves_bb(p, o) == rules.py_legal_moves_bb(p, o)
+        for sq in range(64):
+            assert mod.calc_flip(p, o, sq) == rules.py_calc_flip(p, o, sq)
+
+
+@pytest.mark.parametrize("modname, fn", BATCH_KERNELS)
+def test_batch_kernels_match_python_reference(modname, fn, random_positions):
+    np = pytest.importorskip("numpy")
+    batch = getattr(_kernel_module(modname), fn)
+    pos = random_positions(1000, seed=17)
+    players = np.array([p for p, _ in pos], dtype=np.uint64)
+    opponents = np.array([o for _, o in pos], dtype=np.uint64)
+    out = batch(players, opponents)
+    assert out.dtype == np.uint64
+    assert [int(x) for x in out] == [rules.py_legal_moves_bb(p, o) for p, o in pos]
+
+
+def test_bulk_initial_position():
+    pytest.importorskip("numpy")
+    from reversi.game.rules_np import legal_moves_bulk
+    b = Board.initial()
+    out = legal_moves_bulk([b.black, b.white], [b.white, b.black])
+    assert int(out[0]) == rules.valid_moves_bb(b, "B")
+    assert int(out[1]) == rules.valid_moves_bb(b, "W")
@@ -1,5 +1,6 @@
 import socket
 import sys
+import threading
 import pytest
 
 from reversi.net.tcp_game import TcpGame
@@ -41,6 +42,19 @@ def test_recv_accepts_crlf_and_coalesced_packets():
         b.close()
 
 
+def test_recv_many_pipelined_lines():
+    s1, s2 = _maybe_socketpair()
+    try:
+        a = TcpGame.from_connected(s1)
+        # Enough buffered lines that the read cursor passes the compaction point
+        lines = [f"MOVE:{i % 8},{i // 8 % 8}" for i in range(2000)]
+        s2.sendall(b"".join(l.encode() + (b"\r\n" if i % 3 else b"\n") for i, l in enumerate(lines)))
+        assert [a.recv_line() for _ in lines] == lines
+    finally:
+        a.close()
+        s2.close()
+
+
 def test_send_line_rejects_newlines():
     s1, s2 = _maybe_socketpair()
     try:
@@ -62,3 +76,75 @@ def test_recv_timeout_raises(monkeypatch):
     finally:
         a.close()
         s2.close()
+
+
+def test_tcp_sockets_get_nodelay():
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(1)
+    cli = socket.create_connection(srv.getsockname())
+    conn, _ = srv.accept()
+    try:
+        a = TcpGame.from_connected(cli)
+        b = TcpGame.from_connected(conn)
+        assert cli.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert conn.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        a.send_line("ping")
+        assert b.recv_line() == "ping"
+    finally:
+        a.close()
+        b.close()
+        srv.close()
+
+
+def test_queued_lines_go_out_in_one_write():
+    s1, s2 = _maybe_socketpair()
+    try:
+        a = TcpGame.from_connected(s1, timeout=0.5)
+        a.queue_line("MOVE:D3")
+        s2.settimeout(0.05)
+        with pytest.raises(socket.timeout):
+            s2.recv(64)  # nothing written yet
+        a.send_line("YOU WIN")
+        s2.settimeout(1.0)
+        assert s2.recv(64) == b"MOVE:D3\nYOU WIN\n"
+
+        a.send_lines(["PASS", "DRAW"])
+        assert s2.recv(64) == b"PASS\nDRAW\n"
+
+        a.queue_bytes_line(b"MOVE:0,0\n")
+        a.send_bytes_line(b"ERROR\n")
+        assert s2.recv(64) == b"MOVE:0,0\nERROR\n"
+        with pytest.raises(ProtocolError):
+            a.send_bytes_line(b"PASS")
+    finally:
+        a.close()
+        s2.close()
+
+
+def test_recv_line_flushes_queued_lines():
+    s1, s2 = _maybe_socketpair()
+    try:
+        a = TcpGame.from_connected(s1, timeout=1.0)
+        b = TcpGame.from_connected(s2, timeout=1.0)
+        a.queue_line("PASS")
+        t = threading.Thread(target=lambda: b.send_line(b.recv_line()))
+        t.start()
+        assert a.recv_line() == "PASS"  # only arrives if our queued PASS was sent first
+        t.join(timeout=2)
+    finally:
+        a.close()
+        b.close()
+
+
+def test_close_flushes_queued_lines():
+    s1, s2 = _maybe_socketpair()
+    try:
+        a = TcpGame.from_connected(s1, timeout=1.0)
+        b = TcpGame.from_connected(s2, timeout=1.0)
+        a.queue_bytes_line(b"YOU WIN\n")
+        a.close()
+        assert b.recv_line() == "YOU WIN"
+    finally:
+        a.close()
+        b.close()